@@ -1,7 +1,21 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sqlite3
+import time
+import tracemalloc
+from array import array
+from collections import defaultdict, deque
+from contextlib import closing, contextmanager
+from itertools import groupby, islice
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import geopandas as gpd
-from shapely.geometry import Point, LineString
+import shapely
+from pyproj import CRS, Transformer
 
 def pp_breakdown(plan_item, break_at_nonNumeric):
     """
@@ -226,6 +240,2031 @@ def make_output_dir(input_folder_path):
     Path(input_folder_path).mkdir(parents=True, exist_ok=True)
 
 
+# column names of the processed LX data
+# INT= blocks -> one row per site, with the Phase Plan (PP) data
+COLUMNS_INT_DATA = ['site_id', 'subsystem_id',
+                    'PP1_data', 'PP1_offset1', 'PP1_offset2', 'PP1_phaseStart', 'PP1_phase', 'PP1_slaved',
+                    'PP2_data', 'PP2_offset1', 'PP2_offset2', 'PP2_phaseStart', 'PP2_phase', 'PP2_slaved',
+                    'PP3_data', 'PP3_offset1', 'PP3_offset2', 'PP3_phaseStart', 'PP3_phase', 'PP3_slaved',
+                    'PP4_data', 'PP4_offset1', 'PP4_offset2', 'PP4_phaseStart', 'PP4_phase', 'PP4_slaved']
+
+# SS= blocks -> one row per subsystem, with the Link Plan (LP) data
+COLUMNS_SUBSYS_DATA = ['subsystem_id',
+                       'LP1_data', 'LP1_offset1', 'LP1_offset2', 'LP1_phaseStart', 'LP1_phase', 'LP1_slaved',
+                       'LP2_data', 'LP2_offset1', 'LP2_offset2', 'LP2_phaseStart', 'LP2_phase', 'LP2_slaved',
+                       'LP3_data', 'LP3_offset1', 'LP3_offset2', 'LP3_phaseStart', 'LP3_phase', 'LP3_slaved',
+                       'LP4_data', 'LP4_offset1', 'LP4_offset2', 'LP4_phaseStart', 'LP4_phase', 'LP4_slaved']
+
+# tag for no data in the PP / LP data of plans not extracted
+# [data, offset1, offset2, phaseStart, phase, slaved]
+NO_DATA_PLAN = [-1, -1, -1, -1, -1, -1]
+
+# fields of each PP / LP plan item (see `pp_breakdown` and `lp_breakdown`)
+PLAN_FIELDS = ['data', 'offset1', 'offset2', 'phaseStart', 'phase', 'slaved']
+
+# column names of the normalised (long format) plan data
+# one row per site, plan and record type ('PP' or 'LP'), with the same column names for all plans
+COLUMNS_PLAN_DATA = ['site_id', 'subsystem_id', 'plan_id', 'record_type'] + PLAN_FIELDS
+
+# plans of the PP / LP data in the LX file
+PLAN_IDS = (1, 2, 3, 4)
+
+# types of GIS layers exported for each plan
+RECORD_TYPES = ('PP', 'LP', 'SL')
+
+# link metrics added to the LP and SL layers (see `_link_metrics`)
+LINK_METRIC_COLUMNS = ['link_length', 'link_bearing', 'offset1_per_metre', 'offset2_per_metre']
+
+# columns identifying a subsystem (see `_subsystem_keys`)
+# Subsystem IDs are only unique within each regional computer -> qualified by the LX file when merged
+SUBSYSTEM_KEYS = ['lx_file', 'subsystem_id']
+
+# summary columns of the subsystem corridor layers (see `_subsystem_corridors`)
+CORRIDOR_COLUMNS = ['site_count', 'n_links', 'total_length', 'slaved_count', 'broken_links']
+
+# columns with an SQL attribute index in the exported geopackage layers (see `_index_gpkg_layer`)
+# all `*_slaved` columns are also indexed
+GPKG_INDEX_COLUMNS = ['site_id', 'subsystem_id', 'plan_id', 'record_type', 'to_site']
+
+
+def _is_selected(id_value, selection):
+    """
+    Helper function to check if a Site ID or Subsystem ID (as str) is in a selection of IDs
+
+    Parameters
+    ----------
+    id_value : str
+        ID from the LX file
+    selection : set of int or None
+        Selected IDs. None selects all IDs
+
+    Returns
+    -------
+    bool
+    """
+    if selection is None:
+        return True
+    try:
+        return int(id_value) in selection
+    except ValueError:
+        return False
+
+
+def _as_selection(ids):
+    """
+    Helper function to convert a list of Site IDs or Subsystem IDs to a set of int (None is kept as None)
+    """
+    if ids is None:
+        return None
+    return {int(id_value) for id_value in ids}
+
+
+def _check_selection(plans=PLAN_IDS, record_types=RECORD_TYPES):
+    """
+    Helper function to check the selected plans and record types before processing the LX file
+
+    Raises
+    ------
+    ValueError
+        If a plan is not one of `PLAN_IDS` or a record type is not one of `RECORD_TYPES`
+    """
+    for plan in plans:
+        if plan not in PLAN_IDS:
+            raise ValueError(f'Unknown plan: {plan} (plans are {PLAN_IDS})')
+    for record_type in record_types:
+        if record_type not in RECORD_TYPES:
+            raise ValueError(f'Unknown record type: {record_type} (record types are {RECORD_TYPES})')
+
+
+def _as_input(source):
+    """
+    Helper function to normalise an input file given as a file path, bytes or file object
+
+    Parameters
+    ----------
+    source : str, PosixPath, bytes or file object
+        Input file
+
+    Returns
+    -------
+    source : PosixPath, io.BytesIO, io.StringIO or file object
+        File path, or file object that can be rewound (non-seekable streams are read into memory)
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return Path(source)
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    if not source.seekable():
+        source = source.read()
+        return io.BytesIO(source) if isinstance(source, bytes) else io.StringIO(source)
+    return source
+
+
+def _lx_file_stem(lx_file):
+    """
+    Helper function to get the name of the LX file (without extension) for the exported file names
+    Defaults to 'lx_file' for in-memory inputs
+    """
+    if isinstance(lx_file, (str, os.PathLike)):
+        return Path(lx_file).stem
+    return Path(str(getattr(lx_file, 'name', 'lx_file'))).stem
+
+
+@contextmanager
+def _open_lx(lx_file):
+    """
+    Helper context manager to read the LX file as text, one line at a time
+
+    Parameters
+    ----------
+    lx_file : PosixPath or file object
+        LX file, see `_as_input`
+        File objects are rewound on exit, so the LX file can be read more than once
+
+    Yields
+    ------
+    f : text file object
+    """
+    if isinstance(lx_file, Path):
+        with open(lx_file, 'r') as f:
+            yield f
+        return
+    
+    start = lx_file.tell()
+    # decode binary file objects
+    f = lx_file if isinstance(lx_file, io.TextIOBase) else io.TextIOWrapper(lx_file)
+    try:
+        yield f
+    finally:
+        if f is not lx_file:
+            # release the binary file object without closing it
+            f.detach()
+        lx_file.seek(start)
+
+
+def _iter_lx_windows(lines, window_size):
+    """
+    Helper generator to step through the lines of an LX file with a look-ahead window
+    Only `window_size` lines are held in memory at any time, so the LX file does not
+    need to be read in full (e.g. with `readlines()`)
+
+    Parameters
+    ----------
+    lines : iterable of str
+        Lines of the LX file, e.g. an open file object
+    window_size : int
+        Number of lines in the window, including the current line
+
+    Yields
+    ------
+    count : int
+        Line number of the current line
+    window : collections.deque of str
+        Current line (index 0) and the lines following it.
+        The window is shorter at the end of the file.
+        Note: the same deque is updated in place between iterations
+    """
+    window = deque()
+    count = 0
+    for line in lines:
+        window.append(line)
+        if len(window) == window_size:
+            yield count, window
+            window.popleft()
+            count += 1
+
+    # flush the end of the file
+    while window:
+        yield count, window
+        window.popleft()
+        count += 1
+
+
+def _parse_int_block(window, 
+                     break_at_nonNumeric, 
+                     search_term_subsystem, 
+                     search_term_pp, 
+                     error_ints,
+                     sites=None,
+                     subsystems=None,
+                     plans=(1, 2, 3, 4)):
+    """
+    Helper function to extract the Site ID, Subsystem ID and Phase Plan (PP) data 
+    of a single `INT=` block of the LX file
+
+    Parameters
+    ----------
+    window : sequence of str
+        Lines of the LX file, starting at the line with the `INT=` search term
+    break_at_nonNumeric : bool
+        See `lx_to_gis`
+    search_term_subsystem : str
+        See `lx_to_gis`
+    search_term_pp : str
+        See `lx_to_gis`
+    error_ints : list
+        List of Site IDs with invalid data -> appended to in place
+    sites : set of int, optional
+        Site IDs to extract. Default value is None, which will extract all sites
+    subsystems : set of int, optional
+        Subsystem IDs to extract. Default value is None, which will extract all subsystems
+    plans : tuple of int, optional
+        Plan IDs (1..4) to extract the PP data for. The PP data of other plans is tagged as -1 (no data)
+        Default value is (1, 2, 3, 4)
+
+    Returns
+    -------
+    site_data : list
+        Row of the processed PP data (see `COLUMNS_INT_DATA`)
+        Empty list if the Site ID is invalid, or the site is not selected
+    """
+    site_data = [] # temp storage of data
+    
+    line_items = window[0].strip().split('!')
+    # take index=1 with `INT=`
+    site_id = line_items[1]
+    # split on `=` and take index=1 with the TCS ID
+    site_id = site_id.split('=')
+    site_id = site_id[1].strip()
+
+    try:
+        int(site_id)
+        site_data.append(site_id)
+    except ValueError as e:
+        if break_at_nonNumeric:
+            print(f'[ERROR] Non-numeric Site ID identified: {site_id}, ValueError: {e}')
+            # add to error list with message
+            error_ints.append([site_id, 'Non-numeric Site ID'])
+            raise ValueError
+        else:
+            print(f'[WARNING] Non-numeric Site ID identified: {site_id}, ValueError: {e}')
+            # add to error list with message
+            error_ints.append([site_id, 'Non-numeric Site ID'])
+            # return empty row because site ID is invalid
+            return []
+    
+    # skip the rest of the block if the site is not selected
+    if not _is_selected(site_id, sites):
+        return []
+
+    # search for lines with subsystem ID number, within a few rows of the intersection ID number
+    for line in window:
+        if search_term_subsystem in line:
+            subsystem_line_items = line.strip().split('!')
+            # take index=0 with `S#=`
+            subsystem_id = subsystem_line_items[0]
+            # split on `=` and take index=1 with the Subsystem ID
+            subsystem_id = subsystem_id.split('=')
+            subsystem_id = subsystem_id[1].strip()
+            
+            try:
+                int(subsystem_id)
+                # skip the rest of the block if the subsystem is not selected
+                if not _is_selected(subsystem_id, subsystems):
+                    return []
+                site_data.append(subsystem_id)
+                # found what we were looking for -> stop searching
+                break
+            except ValueError as e:
+                if break_at_nonNumeric:
+                    print(f'[ERROR] Non-numeric Subsystem ID: {subsystem_id}, ValueError: {e}')
+                    # add to error list with message
+                    error_ints.append([site_id, f'Non-numeric Subsystem ID {subsystem_id} for Site ID'])
+                    raise ValueError
+                else:
+                    print(f'[WARNING] Non-numeric Subsystem ID: {subsystem_id}, ValueError: {e}')
+                    # add to error list with message
+                    error_ints.append([site_id, f'Non-numeric Subsystem ID {subsystem_id} for Site ID'])
+                    # allow search to continue, in case valid subsystem available
+    else:
+        if subsystems is not None:
+            # subsystem unknown -> not selected
+            return []
+        # didn't find what we were looking for within the search window
+        error_ints.append([site_id, 'Subsystem not found'])
+
+    # search for lines with Phase Plan (PP) data, within a few rows of the intersection ID number
+    # this defines the local offset point for the intersection
+    # PP1 -> PP4
+    # reminder: range(1,5,2) means [1, 3]
+    # reminder: SCATS LX PP data comes over 2 lines, such as:
+    # PP1=0,0F!PP2=0,0F!
+    # PP3=0,0F!PP4=0,0F!
+    # therefore, can extract two PP at a time
+    for pp_id in range(1,5,2):
+        if (pp_id not in plans) and (pp_id + 1 not in plans):
+            # neither plan selected -> no need to search
+            site_data.extend(NO_DATA_PLAN)
+            site_data.extend(NO_DATA_PLAN)
+            continue
+        
+        search_term_pp_id = f'{search_term_pp}{pp_id}='
+        print(f'[INFO] Processing Site {site_id}, PP{pp_id}')
+
+        for line in window:
+            if search_term_pp_id in line:
+                pp_line_items = line.strip().split('!')
+
+                # get first PP (PP1 or PP3), then second PP (PP2 or PP4)
+                for plan_id, pp_item in zip((pp_id, pp_id + 1), pp_line_items[0:2]):
+                    if plan_id not in plans:
+                        site_data.extend(NO_DATA_PLAN)
+                        continue
+                    # split on `=` and take index=1 with the PP data
+                    pp_item = pp_item.split('=')
+                    pp_item = pp_item[1].strip()
+                    # append PP data
+                    site_data.append(pp_item)
+                    # extract PP metadata
+                    pp_data = pp_breakdown(pp_item, break_at_nonNumeric)
+                    for pp_data_item in pp_data:
+                        site_data.append(pp_data_item)
+
+                # found what we were looking for -> stop searching
+                break
+        else:
+            # didn't find what we were looking for within the search window
+            error_ints.append([site_id, 'Subsystem not found'])
+
+    return site_data
+
+
+def _parse_subsys_block(window, break_at_nonNumeric, error_subsys, subsystems=None, plans=(1, 2, 3, 4)):
+    """
+    Helper function to extract the Subsystem ID and Link Plan (LP) data 
+    of a single `SS=` block of the LX file
+
+    Parameters
+    ----------
+    window : sequence of str
+        Lines of the LX file, starting at the line with the `SS=` search term
+    break_at_nonNumeric : bool
+        See `lx_to_gis`
+    error_subsys : list
+        List of Subsystem IDs with invalid data -> appended to in place
+    subsystems : set of int, optional
+        Subsystem IDs to extract. Default value is None, which will extract all subsystems
+    plans : tuple of int, optional
+        Plan IDs (1..4) to extract the LP data for. The LP data of other plans is tagged as -1 (no data)
+        Default value is (1, 2, 3, 4)
+
+    Returns
+    -------
+    subsys_data : list
+        Row of the processed LP data (see `COLUMNS_SUBSYS_DATA`)
+        Empty list if the subsystem is not selected
+    """
+    subsys_data = [] # temp storage of data
+    
+    line_items = window[0].strip().split('!')
+    # take index=0 with `SS=`
+    subsys_id = line_items[0].strip()
+    # split on `=` and take index=1 with the Subsystem ID
+    subsys_id = subsys_id.split('=')
+    subsys_id = subsys_id[1].strip()
+
+    # skip the rest of the block if the subsystem is not selected
+    if not _is_selected(subsys_id, subsystems):
+        return []
+
+    subsys_data.append(subsys_id)
+
+    # search for lines with Link Plan (LP) data, within a few rows of the subsystem ID number
+    # this defines the offset point from other linked intersections
+    # LP1 -> LP4
+    # reminder: range(1,5) means [1, 2, 3, 4]
+    # reminder: SCATS LX LP data comes over 4 lines -> need to extract one at a time
+    for lp_id in range(1,5):
+        if lp_id not in plans:
+            # plan not selected -> no need to search
+            subsys_data.extend(NO_DATA_PLAN)
+            continue
+        
+        search_term_lp = f'LP{lp_id}='
+        print(f'[INFO] Processing Subsystem {subsys_id}, LP{lp_id}')
+        
+        for line in window:
+            if search_term_lp in line:
+                lp_line_items = line.strip().split('!')
+
+                # get the LP data
+                lp_item = lp_line_items[0]
+                # split on `=` and take index=1 with the Subsystem ID
+                lp_item = lp_item.split('=')
+                lp_item = lp_item[1].strip()
+                # append LP data
+                subsys_data.append(lp_item)
+                # extract LP metadata
+                lp_data = lp_breakdown(lp_item, break_at_nonNumeric)
+                for lp_data_item in lp_data:
+                    subsys_data.append(lp_data_item)
+
+                # found what we were looking for -> stop searching
+                break
+        else:
+            # didn't find what we were looking for within the search window
+            error_subsys.append([subsys_id, 'Subsystem not found'])
+
+    return subsys_data
+
+
+def _iter_int_records(lines, 
+                      break_at_nonNumeric, 
+                      search_term_intID, 
+                      search_term_subsystem, 
+                      search_term_pp, 
+                      search_limit, 
+                      error_ints,
+                      sites=None,
+                      subsystems=None,
+                      plans=(1, 2, 3, 4)):
+    """
+    Helper generator yielding the processed PP data of each selected `INT=` block of the LX file
+    See `_parse_int_block` and `lx_to_gis` for the parameters
+    """
+    for count, window in _iter_lx_windows(lines, search_limit + 2):
+        # search for lines with intersection ID number
+        if search_term_intID in window[0]:
+            site_data = _parse_int_block(window, 
+                                         break_at_nonNumeric, 
+                                         search_term_subsystem, 
+                                         search_term_pp, 
+                                         error_ints,
+                                         sites,
+                                         subsystems,
+                                         plans)
+            # if we have all the data we need, pass it on
+            if len(site_data) > 0:
+                yield site_data
+
+
+def _iter_subsys_records(lines, 
+                         break_at_nonNumeric, 
+                         search_term_subsystemData, 
+                         search_limit, 
+                         skip_initial_lines, 
+                         error_subsys,
+                         subsystems=None,
+                         plans=(1, 2, 3, 4)):
+    """
+    Helper generator yielding the processed LP data of each selected `SS=` block of the LX file
+    See `_parse_subsys_block` and `lx_to_gis` for the parameters
+    """
+    for count, window in _iter_lx_windows(lines, search_limit + 2):
+        # search for lines with subsystem ID number (second section search)
+        if (search_term_subsystemData in window[0]) and (count > skip_initial_lines):
+            subsys_data = _parse_subsys_block(window, break_at_nonNumeric, error_subsys, subsystems, plans)
+            # if we have all the data we need, pass it on
+            if len(subsys_data) > 0:
+                yield subsys_data
+
+
+def _lx_site_subsystems(lx_file_path, 
+                        break_at_nonNumeric, 
+                        search_term_intID, 
+                        search_term_subsystem, 
+                        search_term_pp, 
+                        search_limit, 
+                        sites=None,
+                        subsystems=None):
+    """
+    Helper function to list the selected sites of the LX file with their Subsystem ID
+    Quick search of the `INT=` blocks only, without processing the PP data
+    See `lx_to_gis` for the parameters
+
+    Returns
+    -------
+    df_sites : pandas.DataFrame
+        One row per site, in LX file order, with site_id (int) and subsystem_id (as in the processed LX data)
+    """
+    sites = _as_selection(sites)
+    subsystems = _as_selection(subsystems)
+    # compact storage of the sites (e.g. statewide networks): 
+    # Site IDs as int64, and each Subsystem ID stored once
+    site_ids = array('q')
+    subsystem_ids = {}
+    site_subsystems = []
+    with _open_lx(lx_file_path) as f:
+        for site_data in _iter_int_records(f, 
+                                           break_at_nonNumeric, 
+                                           search_term_intID, 
+                                           search_term_subsystem, 
+                                           search_term_pp, 
+                                           search_limit, 
+                                           [], # errors are recorded in the main search
+                                           sites=sites, 
+                                           subsystems=subsystems,
+                                           plans=()):
+            site_ids.append(int(site_data[0]))
+            site_subsystems.append(subsystem_ids.setdefault(site_data[1], site_data[1]))
+    
+    return pd.DataFrame({'site_id': np.frombuffer(site_ids, dtype='int64'), 
+                         'subsystem_id': site_subsystems}, 
+                        columns=COLUMNS_INT_DATA[:2])
+
+
+def _lx_records_to_plans(lx_int_data, df_subsys, plans=(1, 2, 3, 4)):
+    """
+    Helper function to convert the processed PP data rows into the normalised plan data, joined 
+    with the processed LP data of each subsystem
+
+    Parameters
+    ----------
+    lx_int_data : list of list
+        Rows of processed PP data (see `COLUMNS_INT_DATA`)
+    df_subsys : pandas.DataFrame
+        Processed LP data (see `COLUMNS_SUBSYS_DATA`)
+    plans : tuple of int, optional
+        Plan IDs (1..4) to include
+        Default value is (1, 2, 3, 4)
+
+    Returns
+    -------
+    df_plans : pandas.DataFrame
+        Processed LX data in long format (see `COLUMNS_PLAN_DATA`)
+        Rows are ordered by record type ('PP' then 'LP'), `site_id` and plan ID, so the PP and LP rows 
+        of each site and plan are at the same position within their record type
+    """
+    plans = list(plans)
+    # create dataframes
+    df_intData = pd.DataFrame(lx_int_data, columns=COLUMNS_INT_DATA)
+    df_intData['site_id'] = df_intData['site_id'].astype('int')
+    # sort values
+    df_intData = df_intData.sort_values(by=['site_id'])
+    
+    # LP data of the subsystem of each site
+    # only the subsystems of these sites are joined -> avoids copying all of `df_subsys` for each chunk
+    df_subsys = df_subsys.loc[df_subsys['subsystem_id'].isin(df_intData['subsystem_id'])]
+    df_subsysData = df_intData[['subsystem_id']].merge(df_subsys.drop_duplicates(subset=['subsystem_id']), 
+                                                       on='subsystem_id', how='left')
+    
+    # stack the plans of each site -> one row per site and plan, for each record type
+    # fill any locations with no data with -1 (tag for no data)
+    n_sites = df_intData.shape[0]
+    n_plans = len(plans)
+    plan_data = [df[[f'{record_type}{plan_id}_{field}' for plan_id in plans for field in PLAN_FIELDS]]
+                 .fillna(-1)
+                 .to_numpy(dtype='object')
+                 .reshape(n_sites * n_plans, len(PLAN_FIELDS))
+                 for record_type, df in (('PP', df_intData), ('LP', df_subsysData))]
+    plan_data = np.concatenate(plan_data)
+    
+    df_plans = pd.DataFrame({'site_id': np.tile(np.repeat(df_intData['site_id'].to_numpy(), n_plans), 2),
+                             'subsystem_id': np.tile(np.repeat(df_intData['subsystem_id'].fillna(-1).to_numpy(), n_plans), 2),
+                             'plan_id': np.tile(plans, n_sites * 2).astype('int'),
+                             'record_type': np.repeat(['PP', 'LP'], n_sites * n_plans)})
+    for i, field in enumerate(PLAN_FIELDS):
+        df_plans[field] = plan_data[:, i]
+    # convert linked sites to integer
+    df_plans['slaved'] = df_plans['slaved'].astype('int')
+    
+    return df_plans.infer_objects()
+
+
+def _plans_to_wide(df_plans):
+    """
+    Helper function to convert the normalised plan data back to the wide format of the processed LX data,
+    with one row per site and the PP and LP data of each plan as columns (`PP1_data` ... `LP4_slaved`)
+    The PP and LP data of plans not included in `df_plans` is tagged as -1 (no data)
+
+    Parameters
+    ----------
+    df_plans : pandas.DataFrame
+        Processed LX data in long format (see `_lx_records_to_plans`)
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        Processed LX data in wide format (see `COLUMNS_INT_DATA` and `COLUMNS_SUBSYS_DATA`)
+    """
+    plans = list(pd.unique(df_plans['plan_id']))
+    n_plans = max(len(plans), 1)
+    is_PP = df_plans['record_type'].to_numpy() == 'PP'
+    
+    n_sites = int(is_PP.sum()) // n_plans
+    columns = {'site_id': df_plans['site_id'].to_numpy()[is_PP][::n_plans],
+               'subsystem_id': df_plans['subsystem_id'].to_numpy()[is_PP][::n_plans]}
+    for record_type, rows in (('PP', is_PP), ('LP', ~is_PP)):
+        for field in PLAN_FIELDS:
+            values = df_plans[field].to_numpy()[rows].reshape(n_sites, n_plans)
+            for plan_id in range(1, 5):
+                if plan_id in plans:
+                    columns[f'{record_type}{plan_id}_{field}'] = values[:, plans.index(plan_id)]
+                else:
+                    columns[f'{record_type}{plan_id}_{field}'] = np.full(n_sites, -1)
+    
+    df = pd.DataFrame(columns, columns=COLUMNS_INT_DATA + COLUMNS_SUBSYS_DATA[1:])
+    
+    return df.infer_objects()
+
+
+def _subsystem_keys(df):
+    """
+    Helper function to get the columns identifying a subsystem in a table of processed LX data:
+    `subsystem_id`, qualified by `lx_file` for merged LX files (see `SUBSYSTEM_KEYS`)
+    """
+    return [key for key in SUBSYSTEM_KEYS if key in df.columns]
+
+
+def _finished_subsystems(df_plans, remaining_sites):
+    """
+    Helper function to count down the sites of each subsystem with a chunk of processed LX data, 
+    to find the subsystems with all their sites processed (streaming mode)
+
+    Parameters
+    ----------
+    df_plans : pandas.DataFrame
+        Processed LX data of the chunk, in long format (see `_lx_records_to_plans`)
+    remaining_sites : pandas.Series
+        Number of sites of each subsystem not processed yet, indexed by subsystem (see `_subsystem_keys`)
+
+    Returns
+    -------
+    finished : pandas.Index
+        Subsystems with all their sites processed, up to and including this chunk
+    remaining_sites : pandas.Series
+        Number of sites of the other subsystems not processed yet
+    """
+    is_PP = df_plans['record_type'].to_numpy() == 'PP'
+    keys = _subsystem_keys(df_plans)
+    chunk_sites = (df_plans.loc[is_PP, keys + ['site_id']]
+                   .drop_duplicates()
+                   .groupby(keys)
+                   .size())
+    remaining_sites = remaining_sites.sub(chunk_sites, fill_value=0)
+    is_finished = (remaining_sites <= 0).to_numpy()
+    
+    return remaining_sites.index[is_finished], remaining_sites.loc[~is_finished]
+
+
+def _split_finished(totals, finished):
+    """
+    Helper function to split totals by subsystem (e.g. the subsystem corridor totals) into the totals 
+    of the finished subsystems and the totals of the others
+
+    Parameters
+    ----------
+    totals : pandas.DataFrame or pandas.Series
+        Totals indexed by subsystem (see `_subsystem_keys`), then by other levels (e.g. plan_id)
+    finished : pandas.Index
+        Finished subsystems (see `_finished_subsystems`). None for all subsystems
+
+    Returns
+    -------
+    totals_finished, totals_pending : pandas.DataFrame or pandas.Series
+    """
+    if finished is None:
+        return totals, totals.iloc[:0]
+    subsystem = totals.index.droplevel([level for level in totals.index.names if level not in SUBSYSTEM_KEYS])
+    is_finished = subsystem.isin(finished)
+    
+    return totals.loc[is_finished], totals.loc[~is_finished]
+
+
+def _read_scats_sites(scats_sites_path, 
+                      col_scats_x, 
+                      col_scats_y, 
+                      scats_input_crs_id, 
+                      scats_projected_crs_id):
+    """
+    Helper function to read the SCATS site locations as a coordinate lookup table, sorted by Site ID
+    The table is built once per run, and used for every join on Site ID (see `_lookup_xy`)
+    See `lx_to_gis` for the parameters
+
+    Returns
+    -------
+    site_index : tuple
+        (site_ids, site_xy, crs)
+        - site_ids : numpy.ndarray of int, sorted Site IDs (one per Site ID)
+        - site_xy : numpy.ndarray of float, (x, y) coordinates of each Site ID, in the projected CRS
+        - crs : pyproj.CRS of `site_xy`
+    """
+    # Read SCATS site location data
+    # only the columns required for merging are kept
+    df_scatsLoc = pd.read_csv(_as_input(scats_sites_path), 
+                              usecols=['Equipment_ID', col_scats_x, col_scats_y])
+    df_scatsLoc['Equipment_ID'] = pd.to_numeric(df_scatsLoc['Equipment_ID'], errors='coerce')
+    df_scatsLoc = df_scatsLoc.dropna()
+    
+    # sort by Site ID, keeping the first location of any duplicated Site ID
+    site_ids, first_index = np.unique(df_scatsLoc['Equipment_ID'].to_numpy(dtype='int64'), return_index=True)
+    x = df_scatsLoc[col_scats_x].to_numpy(dtype='float')[first_index]
+    y = df_scatsLoc[col_scats_y].to_numpy(dtype='float')[first_index]
+    
+    # set CRS
+    crs = CRS.from_epsg(scats_input_crs_id)
+    # re-project to NSW Lambert (project coordinate system)
+    if scats_projected_crs_id:
+        crs_projected = CRS.from_epsg(scats_projected_crs_id)
+        x, y = Transformer.from_crs(crs, crs_projected, always_xy=True).transform(x, y)
+        crs = crs_projected
+    
+    return site_ids, np.column_stack([x, y]), crs
+
+
+def _lookup_xy(site_index, site_ids):
+    """
+    Helper function to look up the coordinates of Site IDs, with a binary search of the sorted 
+    SCATS site locations (replaces merging on Site ID)
+
+    Parameters
+    ----------
+    site_index : tuple
+        SCATS site locations (see `_read_scats_sites`)
+    site_ids : array-like of int
+        Site IDs to look up
+
+    Returns
+    -------
+    xy : numpy.ndarray of float
+        (x, y) coordinates of each Site ID, NaN for sites without location data
+    """
+    index_ids, index_xy, _ = site_index
+    site_ids = np.asarray(site_ids, dtype='int64')
+    xy = np.full((len(site_ids), 2), np.nan)
+    if len(index_ids) == 0:
+        return xy
+    
+    pos = np.minimum(np.searchsorted(index_ids, site_ids), len(index_ids) - 1)
+    found = index_ids[pos] == site_ids
+    xy[found] = index_xy[pos[found]]
+    
+    return xy
+
+
+def _points(xy, crs):
+    """
+    Helper function to create the point geometry of each site from the (x, y) coordinates
+    Sites without location data (NaN) have `None` geometry
+    """
+    points = gpd.points_from_xy(xy[:, 0], xy[:, 1], crs=crs)
+    points[np.isnan(xy).any(axis=1)] = None
+    return points
+
+
+def _link_key(from_site, to_site):
+    """
+    Helper function to encode (from_site, to_site) pairs of Site IDs as a single sortable int64 key
+    Site IDs (including the negative tags for no link) are assumed to fit in 32-bit integers
+    """
+    return (np.asarray(from_site, dtype='int64') << 32) + (np.asarray(to_site, dtype='int64') + 2**31)
+
+
+def _find_links(links, from_site, to_site):
+    """
+    Helper function to find the links from `from_site` to `to_site` (row by row), with a binary search 
+    of the sorted link keys
+
+    Returns
+    -------
+    link_pos : numpy.ndarray of int
+        Position of each link in `links` (see `_build_links`), -1 where no link exists
+    """
+    link_keys = links.index.to_numpy()
+    keys = _link_key(from_site, to_site)
+    if len(link_keys) == 0:
+        return np.full(len(keys), -1)
+    
+    pos = np.minimum(np.searchsorted(link_keys, keys), len(link_keys) - 1)
+    return np.where(link_keys[pos] == keys, pos, -1)
+
+
+def _build_links(df_plans, site_index, record_types=RECORD_TYPES):
+    """
+    Helper function to build the geometry of every link between sites, across all plans
+    
+    The same pair of sites is often linked in several plans (LP1..LP4 and PP1..PP4 slaved sites).
+    Each unique (from_site, to_site) pair is only built once, and the same LineString is then 
+    shared by every plan layer that uses it (see `_iter_plan_layers`).
+
+    Parameters
+    ----------
+    df_plans : pandas.DataFrame
+        Processed LX data in long format (see `_lx_records_to_plans`)
+    site_index : tuple
+        SCATS site locations (see `_read_scats_sites`)
+    record_types : tuple of str, optional
+        Types of layers to build the links for ('LP' and/or 'SL')
+        Default value is ('PP', 'LP', 'SL')
+
+    Returns
+    -------
+    links : gpd.GeoDataFrame
+        One row per unique link, indexed and sorted by link key (see `_link_key`), with:
+        - from_site, to_site : Site IDs
+        - link_length : length of the link, in the units of the coordinate system
+        - link_bearing : bearing from `from_site` to `to_site`, in degrees clockwise from north (0..360)
+        - geometry : LineString from `from_site` to `to_site`
+        Links to sites without location data are not included
+    """
+    # pairs of linked sites, across all plans
+    # note: the LP links use the LP data, the SL links use the PP (slaved) data
+    # note: the SL layers only include sites with LP links
+    data_types = []
+    if ('LP' in record_types) or ('SL' in record_types):
+        data_types.append('LP')
+    if 'SL' in record_types:
+        data_types.append('PP')
+    
+    df_links = df_plans.loc[df_plans['record_type'].isin(data_types)]
+    from_site = df_links['site_id'].to_numpy(dtype='int64')
+    to_site = df_links['slaved'].to_numpy(dtype='int64')
+    
+    # unique pairs, sorted by link key
+    link_keys, first_index = np.unique(_link_key(from_site, to_site), return_index=True)
+    from_site = from_site[first_index]
+    to_site = to_site[first_index]
+    
+    # look up the coordinates of both ends of each link
+    from_xy = _lookup_xy(site_index, from_site)
+    to_xy = _lookup_xy(site_index, to_site)
+    
+    # delete any links where either site has no location data
+    valid = ~(np.isnan(from_xy).any(axis=1) | np.isnan(to_xy).any(axis=1))
+    from_xy = from_xy[valid]
+    to_xy = to_xy[valid]
+    
+    # length and bearing of each link
+    dx = to_xy[:, 0] - from_xy[:, 0]
+    dy = to_xy[:, 1] - from_xy[:, 1]
+    links = gpd.GeoDataFrame({'from_site': from_site[valid],
+                              'to_site': to_site[valid],
+                              'link_length': np.hypot(dx, dy), 
+                              'link_bearing': np.degrees(np.arctan2(dx, dy)) % 360},
+                             index=pd.Index(link_keys[valid], name='link_key'),
+                             geometry=shapely.linestrings(np.stack([from_xy, to_xy], axis=1)),
+                             crs=site_index[2])
+    
+    return links
+
+
+def _link_metrics(df_plans, links, record_types=RECORD_TYPES):
+    """
+    Helper function to compute the metrics of every LP and SL link, for all plans at once
+    
+    The LP links use the LP rows of the plan data, and the SL links use the PP (slaved) rows, so all plans
+    are looked up against `links` in a single pass, with no per-row or per-plan processing.
+
+    Parameters
+    ----------
+    df_plans : pandas.DataFrame
+        Processed LX data in long format (see `_lx_records_to_plans`)
+    links : gpd.GeoDataFrame
+        Links between sites (see `_build_links`), in a projected coordinate system
+    record_types : tuple of str, optional
+        Types of links to compute the metrics for ('LP' and/or 'SL')
+        Default value is ('PP', 'LP', 'SL')
+
+    Returns
+    -------
+    metrics : pandas.DataFrame
+        One row per link exported in the LP / SL layers, with:
+        - site_id, subsystem_id, plan_id, record_type ('LP' or 'SL'), to_site
+        - lx_file : LX file of the site, only if `df_plans` has an `lx_file` column (merged LX files)
+        - link_length : length of the link (metres for a projected coordinate system in metres)
+        - link_bearing : bearing of the link, in degrees clockwise from north
+        - offset1_per_metre, offset2_per_metre : offsets (lower and upper offset number) divided by 
+          `link_length` (NaN for zero-length links or non-numeric offsets)
+        - row : position of the site and plan within the PP (or LP) rows of `df_plans`
+        - link_pos : position of the link in `links`
+    """
+    is_PP = df_plans['record_type'].to_numpy() == 'PP'
+    n_rows = int(is_PP.sum())
+    
+    # stack the LP rows (LP links) and PP rows (SL links) -> one block of `n_rows` rows each
+    blocks = [record_type for record_type in ('LP', 'SL') if record_type in record_types]
+    data_rows = {'LP': ~is_PP, 'SL': is_PP}
+    
+    def stack(column):
+        return np.concatenate([df_plans[column].to_numpy()[data_rows[record_type]] for record_type in blocks] 
+                              or [np.array([], dtype='int')])
+    
+    site_id = stack('site_id')
+    to_site = stack('slaved')
+    offset1 = pd.to_numeric(pd.Series(stack('offset1')), errors='coerce').to_numpy(dtype='float')
+    offset2 = pd.to_numeric(pd.Series(stack('offset2')), errors='coerce').to_numpy(dtype='float')
+    
+    # look up the links of all plans at once
+    link_pos = _find_links(links, site_id, to_site)
+    keep = link_pos >= 0
+    
+    # the SL layers only include sites with an LP link (of the same plan)
+    # -> the LP row of each site and plan is at the same position as its PP row
+    if 'SL' in record_types:
+        has_LP = _find_links(links, 
+                             df_plans['site_id'].to_numpy()[~is_PP], 
+                             df_plans['slaved'].to_numpy()[~is_PP]) >= 0
+        keep &= np.concatenate([has_LP if record_type == 'SL' else np.ones(n_rows, dtype='bool') 
+                                for record_type in blocks])
+    
+    link_pos = link_pos[keep]
+    link_length = links['link_length'].to_numpy()[link_pos]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        offset1_per_metre = np.where(link_length > 0, offset1[keep] / link_length, np.nan)
+        offset2_per_metre = np.where(link_length > 0, offset2[keep] / link_length, np.nan)
+    
+    metrics = pd.DataFrame({'site_id': site_id[keep],
+                            'subsystem_id': stack('subsystem_id')[keep],
+                            'plan_id': stack('plan_id').astype('int')[keep],
+                            'record_type': np.repeat(blocks, n_rows).astype('str')[keep],
+                            'to_site': to_site[keep],
+                            'link_length': link_length,
+                            'link_bearing': links['link_bearing'].to_numpy()[link_pos],
+                            'offset1_per_metre': offset1_per_metre,
+                            'offset2_per_metre': offset2_per_metre,
+                            'row': np.tile(np.arange(n_rows), len(blocks))[keep],
+                            'link_pos': link_pos})
+    if 'lx_file' in df_plans.columns:
+        # LX file of the site of each link (merged LX files, see `merge_lx_to_gis`)
+        metrics.insert(1, 'lx_file', stack('lx_file')[keep])
+    
+    return metrics
+
+
+def _summarise_link_metrics(metrics):
+    """
+    Helper function to total the link metrics by subsystem, plan and record type
+    The totals can be added together across chunks (see `_add_link_totals`)
+    Subsystems are identified by `_subsystem_keys` (qualified by the LX file for merged LX files)
+
+    Parameters
+    ----------
+    metrics : pandas.DataFrame
+        Link metrics (see `_link_metrics`)
+
+    Returns
+    -------
+    totals : pandas.DataFrame
+        Indexed by subsystem, plan_id and record_type, with subsystem_id as in the processed LX data
+        (converted to numbers in `_link_metrics_summary`)
+    """
+    keys = _subsystem_keys(metrics) + ['plan_id', 'record_type']
+    return (metrics
+            .assign(offset1_count=metrics['offset1_per_metre'].notna(),
+                    offset2_count=metrics['offset2_per_metre'].notna())
+            .groupby(keys)
+            .agg(n_links=('site_id', 'size'),
+                 total_length=('link_length', 'sum'),
+                 offset1_per_metre=('offset1_per_metre', 'sum'),
+                 offset1_count=('offset1_count', 'sum'),
+                 offset2_per_metre=('offset2_per_metre', 'sum'),
+                 offset2_count=('offset2_count', 'sum')))
+
+
+def _add_link_totals(totals):
+    """
+    Helper function to add together the link metric totals of several chunks (see `_summarise_link_metrics`)
+    None items (no totals yet) are skipped
+    """
+    totals = pd.concat([chunk for chunk in totals if chunk is not None])
+    
+    return totals.groupby(level=list(range(totals.index.nlevels))).sum()
+
+
+def _link_metrics_summary(totals):
+    """
+    Helper function to summarise the link metrics of each subsystem
+
+    Parameters
+    ----------
+    totals : list of pandas.DataFrame
+        Link metric totals of each chunk (see `_summarise_link_metrics`)
+
+    Returns
+    -------
+    df_summary : pandas.DataFrame
+        One row per subsystem, plan and record type ('LP' or 'SL'), sorted by subsystem, plan_id and 
+        record_type with numeric Subsystem IDs, with:
+        - lx_file : LX file of the subsystem, only for merged LX files (see `_subsystem_keys`)
+        - n_links : number of links
+        - total_length, mean_length : total and mean link length
+        - mean_offset1_per_metre, mean_offset2_per_metre : mean offsets per metre of link length
+    """
+    df_summary = _add_link_totals(totals)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df_summary['mean_length'] = df_summary['total_length'] / df_summary['n_links']
+        df_summary['mean_offset1_per_metre'] = df_summary['offset1_per_metre'] / df_summary['offset1_count']
+        df_summary['mean_offset2_per_metre'] = df_summary['offset2_per_metre'] / df_summary['offset2_count']
+    df_summary = df_summary.drop(columns=['offset1_per_metre', 'offset1_count', 
+                                          'offset2_per_metre', 'offset2_count'])
+    keys = list(df_summary.index.names)
+    df_summary = df_summary.reset_index()
+    df_summary['subsystem_id'] = pd.to_numeric(df_summary['subsystem_id'], errors='coerce')
+    
+    return df_summary.sort_values(keys, kind='stable', ignore_index=True)
+
+
+def _export_link_metrics(link_totals, finished, output_path, processed_format, writer=None):
+    """
+    Helper function to export the link metric summary of the finished subsystems (appended to the 
+    `LX_linkMetrics` table), keeping the link metric totals of the other subsystems
+    See `_export_lx_chunks` for the parameters
+
+    Parameters
+    ----------
+    link_totals : pandas.DataFrame
+        Link metric totals of the subsystems not exported yet (see `_add_link_totals`)
+    finished : pandas.Index
+        Subsystems to export (see `_finished_subsystems`). None to export all subsystems
+    output_path : PosixPath
+        File path of the `LX_linkMetrics` table, without the file extension
+    writer : file object or pyarrow.parquet.ParquetWriter, optional
+        Open writer of the `LX_linkMetrics` table (see `_write_table`)
+        Default value is None, which will create a new file
+
+    Returns
+    -------
+    link_totals : pandas.DataFrame
+        Link metric totals of the subsystems not exported
+    writer : file object or pyarrow.parquet.ParquetWriter
+        Open writer to pass to the next call (None if nothing was exported) -> must be closed by the caller
+    """
+    totals, totals_pending = _split_finished(link_totals, finished)
+    # note: the table is always created, even without links
+    if (totals.shape[0] > 0) or ((finished is None) and (writer is None)):
+        writer = _write_table(_link_metrics_summary([totals]), output_path, processed_format, writer)
+    
+    return totals_pending, writer
+
+
+def _corridor_totals(df_plans, links, metrics, record_types=RECORD_TYPES):
+    """
+    Helper function to total the sites and links of each subsystem and plan, for the subsystem corridors
+    The totals can be added together across chunks (see `_add_corridor_totals`), and only keep the 
+    link keys (not the geometry) -> memory use is small in streaming mode
+    Subsystems are identified by `_subsystem_keys` (qualified by the LX file for merged LX files)
+
+    Parameters
+    ----------
+    df_plans : pandas.DataFrame
+        Processed LX data in long format (see `_lx_records_to_plans`), without sites with no location data
+    links : gpd.GeoDataFrame
+        Links between sites (see `_build_links`)
+    metrics : pandas.DataFrame
+        Link metrics (see `_link_metrics`)
+    record_types : tuple of str, optional
+        Types of links to include ('LP' and/or 'SL')
+        Default value is ('PP', 'LP', 'SL')
+
+    Returns
+    -------
+    totals : pandas.DataFrame
+        Indexed by subsystem and plan_id, with:
+        - site_count : number of sites
+        - slaved_count : number of sites slaved to another site (PP data)
+        - broken_links : number of links to a site without location data
+    corridor_links : pandas.Series
+        Link key (see `_link_key`) of the unique links of each subsystem and plan (LP and SL links of 
+        the same sites are only included once), indexed by subsystem and plan_id
+    """
+    is_PP = df_plans['record_type'].to_numpy() == 'PP'
+    site_id = df_plans['site_id'].to_numpy(dtype='int64')
+    to_site = df_plans['slaved'].to_numpy(dtype='int64')
+    
+    # links that could not be built, as the linked site has no location data
+    # note: the LP links use the LP rows, the SL links use the PP (slaved) rows
+    is_link_row = np.where(is_PP, 'SL' in record_types, ('LP' in record_types) or ('SL' in record_types))
+    broken = is_link_row & (to_site > 0) & (_find_links(links, site_id, to_site) < 0)
+    
+    # sites of each subsystem and plan
+    # -> the LP row of each site and plan is at the same position as its PP row
+    keys = _subsystem_keys(df_plans) + ['plan_id']
+    df_sites = pd.DataFrame({key: df_plans[key].to_numpy()[is_PP] for key in keys})
+    df_sites['is_slaved'] = to_site[is_PP] > 0
+    df_sites['broken_links'] = broken[is_PP].astype('int') + broken[~is_PP].astype('int')
+    totals = (df_sites
+              .groupby(keys)
+              .agg(site_count=('is_slaved', 'size'),
+                   slaved_count=('is_slaved', 'sum'),
+                   broken_links=('broken_links', 'sum')))
+    
+    corridor_links = (metrics[keys]
+                      .assign(link_key=links.index.to_numpy()[metrics['link_pos'].to_numpy()])
+                      .drop_duplicates()
+                      .set_index(keys)['link_key'])
+    
+    return totals, corridor_links
+
+
+def _add_corridor_totals(corridor_totals):
+    """
+    Helper function to add together the subsystem corridor totals of several chunks (see `_corridor_totals`)
+    The links of a site are all in the same chunk, so the links of each chunk do not overlap
+    None items (no totals yet) are skipped
+    """
+    corridor_totals = [chunk for chunk in corridor_totals if chunk is not None]
+    totals = pd.concat([chunk[0] for chunk in corridor_totals])
+    totals = totals.groupby(level=list(range(totals.index.nlevels))).sum()
+    corridor_links = pd.concat([chunk[1] for chunk in corridor_totals])
+    
+    return totals, corridor_links
+
+
+def _subsystem_corridors(corridor_totals, site_index):
+    """
+    Helper function to dissolve the LP and SL links of each subsystem into a single corridor, for all plans at once
+
+    Parameters
+    ----------
+    corridor_totals : tuple
+        (totals, corridor_links) of all chunks (see `_corridor_totals` and `_add_corridor_totals`)
+    site_index : tuple
+        SCATS site locations (see `_read_scats_sites`)
+
+    Returns
+    -------
+    corridors : gpd.GeoDataFrame
+        One row per subsystem and plan, sorted by subsystem and plan_id, with:
+        - subsystem_id, plan_id (and lx_file for merged LX files, see `_subsystem_keys`)
+        - site_count : number of sites
+        - n_links : number of unique links
+        - total_length : total length of the unique links
+        - slaved_count : number of sites slaved to another site (PP data)
+        - broken_links : number of links to a site without location data
+        - geometry : MultiLineString of the unique links, None for subsystems without links
+    """
+    corridors, corridor_links = corridor_totals
+    group = corridors.index.get_indexer(corridor_links.index)
+    
+    # rebuild the links from the link keys (see `_link_key`)
+    # note: links are only kept if both sites have location data
+    link_keys = corridor_links.to_numpy()
+    from_xy = _lookup_xy(site_index, link_keys >> 32)
+    to_xy = _lookup_xy(site_index, (link_keys & 0xFFFFFFFF) - 2**31)
+    
+    geometry = np.full(corridors.shape[0], None, dtype='object')
+    if len(link_keys) > 0:
+        # dissolve in a single pass, grouped by subsystem and plan
+        order = np.argsort(group, kind='stable')
+        shapely.multilinestrings(shapely.linestrings(np.stack([from_xy[order], to_xy[order]], axis=1)), 
+                                 indices=group[order], 
+                                 out=geometry)
+    
+    corridors['n_links'] = np.bincount(group, minlength=corridors.shape[0])
+    corridors['total_length'] = np.bincount(group, 
+                                            weights=np.hypot(*(to_xy - from_xy).T), 
+                                            minlength=corridors.shape[0])
+    corridors = corridors[CORRIDOR_COLUMNS].reset_index()
+    
+    return gpd.GeoDataFrame(corridors, geometry=geometry, crs=site_index[2])
+
+
+def _export_corridors(corridor_totals, 
+                      finished, 
+                      site_index, 
+                      output_gis_folderPath, 
+                      lx_fileName, 
+                      layers_written, 
+                      plans=(1, 2, 3, 4), 
+                      profile_data=None):
+    """
+    Helper function to export the corridors of the finished subsystems to the geopackage of each plan
+    (appended to the `SSx_corridors` layers), keeping the corridor totals of the other subsystems
+    See `_export_lx_chunks` for the parameters
+
+    Parameters
+    ----------
+    corridor_totals : tuple
+        (totals, corridor_links) of the subsystems not exported yet (see `_add_corridor_totals`)
+    finished : pandas.Index
+        Subsystems to export (see `_finished_subsystems`). None to export all subsystems
+
+    Returns
+    -------
+    corridor_totals : tuple
+        (totals, corridor_links) of the subsystems not exported
+    """
+    totals, totals_pending = _split_finished(corridor_totals[0], finished)
+    corridor_links, corridor_links_pending = _split_finished(corridor_totals[1], finished)
+    
+    if totals.shape[0] > 0:
+        with _profile_stage(profile_data, 'corridors'):
+            corridors = _subsystem_corridors((totals, corridor_links), site_index)
+        for plan_id, layer_name, gdf_export in _iter_corridor_layers(corridors, plans):
+            with _profile_stage(profile_data, f'to_file_{layer_name}'):
+                _write_layer(gdf_export, 
+                             Path(output_gis_folderPath)/f'LX_plan{plan_id}_{lx_fileName[:-3]}.gpkg', 
+                             layer_name, 
+                             layers_written)
+    
+    return totals_pending, corridor_links_pending
+
+
+def _iter_corridor_layers(corridors, plans=(1, 2, 3, 4)):
+    """
+    Helper generator yielding the subsystem corridor layer of every plan
+
+    Parameters
+    ----------
+    corridors : gpd.GeoDataFrame
+        Subsystem corridors of all plans (see `_subsystem_corridors`)
+    plans : tuple of int, optional
+        Plan IDs (1..4) to yield the layers for
+        Default value is (1, 2, 3, 4)
+
+    Yields
+    ------
+    plan_id : int
+        Plan ID (1..4) of the layer
+    layer_name : str
+        Name of the geopackage layer: `SSx_corridors`
+    gdf_export : gpd.GeoDataFrame
+        Layer data. Layers with no data are not yielded.
+    """
+    plan_rows = corridors.groupby('plan_id').indices
+    for plan_id in plans:
+        if plan_id in plan_rows:
+            yield plan_id, f'SS{plan_id}_corridors', (corridors.iloc[plan_rows[plan_id]]
+                                                      .drop(columns=['plan_id'])
+                                                      .reset_index(drop=True))
+
+
+def _iter_plan_layers(df_plans, plans_xy, crs, links, metrics, plans=(1, 2, 3, 4), record_types=RECORD_TYPES):
+    """
+    Helper generator yielding the GIS layers of every plan, from a single grouping of the plan data by plan
+
+    Parameters
+    ----------
+    df_plans : pandas.DataFrame
+        Processed LX data in long format (see `_lx_records_to_plans`), without sites with no location data
+    plans_xy : numpy.ndarray of float
+        (x, y) coordinates of the site of each row of `df_plans`
+    crs : pyproj.CRS
+        Coordinate system of `plans_xy`
+    links : gpd.GeoDataFrame
+        Links between sites (see `_build_links`)
+    metrics : pandas.DataFrame
+        Link metrics (see `_link_metrics`)
+    plans : tuple of int, optional
+        Plan IDs (1..4) to yield the layers for
+        Default value is (1, 2, 3, 4)
+    record_types : tuple of str, optional
+        Types of layers to yield ('PP', 'LP' and/or 'SL')
+        Default value is ('PP', 'LP', 'SL')
+
+    Yields
+    ------
+    plan_id : int
+        Plan ID (1..4) of the layer
+    layer_name : str
+        Name of the geopackage layer: `PPx_data`, `LPx_data` or `SLx_data`
+    gdf_export : gpd.GeoDataFrame
+        Layer data. LP and SL layers with no data are not yielded.
+    """
+    # one row per site and plan, with the PP and LP data side by side
+    # -> the PP and LP rows of each site and plan are at the same position within their record type
+    is_PP = df_plans['record_type'].to_numpy() == 'PP'
+    df_PP = df_plans.loc[is_PP]
+    df_LP = df_plans.loc[~is_PP]
+    df_sitePlans = pd.DataFrame({'site_id': df_PP['site_id'].to_numpy(), 
+                                 'subsystem_id': df_PP['subsystem_id'].to_numpy()})
+    for record_type, df in (('PP', df_PP), ('LP', df_LP)):
+        for field in PLAN_FIELDS:
+            df_sitePlans[f'{record_type}_{field}'] = df[field].to_numpy()
+    xy = plans_xy[is_PP]
+    
+    # group the site plans and the link metrics by plan
+    site_plan_rows = pd.Series(df_PP['plan_id'].to_numpy()).groupby(df_PP['plan_id'].to_numpy()).indices
+    metrics_layers = metrics.groupby(['plan_id', 'record_type']).indices
+    
+    for plan_id in plans:
+        # PART A - CREATE PPx DATA EXPORT
+        # Show the internal reference point of each intersection
+        # keep the PP_data and LP_data column names -> this will make creating generic GIS styles easier
+        rows = site_plan_rows.get(plan_id, np.array([], dtype='int'))
+        df = (df_sitePlans.iloc[rows]
+              .reset_index(drop=True)
+              .infer_objects() # data types of this plan only
+              .rename(columns={f'{record_type}_{field}': f'{record_type}{plan_id}_{field}' 
+                               for record_type in ('PP', 'LP') for field in PLAN_FIELDS[1:]}))
+        
+        if 'PP' in record_types:
+            yield plan_id, f'PP{plan_id}_data', gpd.GeoDataFrame(df, geometry=_points(xy[rows], crs))
+        
+        # PART B / C - CREATE LPx AND SL DATA EXPORTS
+        # Show the adjacent sites the intersection is linked to
+        # Note: LPx = standard linkage between sites, SL = SLaved & hard-linkage
+        for record_type in ('LP', 'SL'):
+            if record_type not in record_types:
+                continue
+            
+            # check if there are any links
+            # skip export if empty - there's nothing anyway
+            if (plan_id, record_type) in metrics_layers:
+                metrics_layer = metrics.iloc[metrics_layers[(plan_id, record_type)]]
+                # LineString for the linkages, shared with the other plans
+                # note: `row` is the position in `df_sitePlans` -> position in `df` of this plan
+                gdf_export = gpd.GeoDataFrame(df.iloc[np.searchsorted(rows, metrics_layer['row'].to_numpy())]
+                                              .reset_index(drop=True)
+                                              .assign(**{column: metrics_layer[column].to_numpy() 
+                                                         for column in LINK_METRIC_COLUMNS}),
+                                              geometry=links.geometry.values.take(metrics_layer['link_pos'].to_numpy()),
+                                              crs=links.crs)
+                yield plan_id, f'{record_type}{plan_id}_data', gdf_export
+            else:
+                print(f'[INFO] No {record_type} sites for Plan ID: {plan_id}')
+
+
+def _iter_all_plans_layers(df_plans, plans_xy, crs, links, metrics, record_types=RECORD_TYPES):
+    """
+    Helper generator yielding the combined GIS layers of all plans, in long format 
+    (one row per site / link, plan and record type), to query all plans from a single layer
+
+    Parameters
+    ----------
+    df_plans : pandas.DataFrame
+        Processed LX data in long format (see `_lx_records_to_plans`), without sites with no location data
+    plans_xy : numpy.ndarray of float
+        (x, y) coordinates of the site of each row of `df_plans`
+    crs : pyproj.CRS
+        Coordinate system of `plans_xy`
+    links : gpd.GeoDataFrame
+        Links between sites (see `_build_links`)
+    metrics : pandas.DataFrame
+        Link metrics (see `_link_metrics`)
+    record_types : tuple of str, optional
+        Types of layers to include ('PP', 'LP' and/or 'SL')
+        Default value is ('PP', 'LP', 'SL')
+
+    Yields
+    ------
+    layer_name : str
+        Name of the geopackage layer:
+        - `allPlans_sites` : PP and LP data of each site and plan, with the site location (Point)
+        - `allPlans_links` : LP and SL links of each site and plan, with the link metrics (LineString)
+    gdf_export : gpd.GeoDataFrame
+        Layer data. Layers with no data are not yielded.
+    """
+    if ('PP' in record_types) and (df_plans.shape[0] > 0):
+        yield 'allPlans_sites', gpd.GeoDataFrame(df_plans.reset_index(drop=True), 
+                                                 geometry=_points(plans_xy, crs))
+    
+    if metrics.shape[0] > 0:
+        # LP links use the LP data, SL links use the PP (slaved) data
+        # -> `row` is the position within the rows of that record type
+        is_PP = df_plans['record_type'].to_numpy() == 'PP'
+        record_type = metrics['record_type'].to_numpy()
+        is_SL = record_type == 'SL'
+        rows = metrics['row'].to_numpy().copy()
+        rows[is_SL] = np.flatnonzero(is_PP)[rows[is_SL]]
+        rows[~is_SL] = np.flatnonzero(~is_PP)[rows[~is_SL]]
+        df = (df_plans.iloc[rows]
+              .reset_index(drop=True)
+              .assign(record_type=record_type, 
+                      **{column: metrics[column].to_numpy() for column in LINK_METRIC_COLUMNS}))
+        yield 'allPlans_links', gpd.GeoDataFrame(df, 
+                                                 geometry=links.geometry.values.take(metrics['link_pos'].to_numpy()),
+                                                 crs=links.crs)
+
+
+def _write_layer(gdf, gpkg_path, layer_name, layers_written):
+    """
+    Helper function to export a GIS layer (or chunk of the layer) to a geopackage, with an R-tree spatial index
+
+    Parameters
+    ----------
+    gdf : gpd.GeoDataFrame
+        Layer data to export
+    gpkg_path : PosixPath
+        File path to the geopackage
+    layer_name : str
+        Name of the geopackage layer
+    layers_written : set of tuple
+        (gpkg_path, layer_name) of the layers already created by this run -> appended to in place
+        The data is appended to these layers, other layers are (re)created
+    """
+    append = (gpkg_path, layer_name) in layers_written
+    gdf.to_file(gpkg_path, 
+                driver='GPKG', 
+                layer=layer_name, 
+                mode='a' if append else 'w', 
+                SPATIAL_INDEX='YES')
+    layers_written.add((gpkg_path, layer_name))
+
+
+def _index_gpkg_layer(gpkg_path, layer_name):
+    """
+    Helper function to add SQL attribute indexes to a geopackage layer
+    Indexes the ID columns (see `GPKG_INDEX_COLUMNS`) and the `*_slaved` columns, and the 
+    (subsystem_id, plan_id) pair if available, so queries on these columns are index seeks.
+    The pair is qualified by `lx_file` for merged LX files (see `SUBSYSTEM_KEYS`).
+    Run once all the data is written (indexes are then built once rather than updated for each chunk)
+
+    Parameters
+    ----------
+    gpkg_path : PosixPath
+        File path to the geopackage
+    layer_name : str
+        Name of the geopackage layer
+    """
+    with closing(sqlite3.connect(gpkg_path)) as con:
+        columns = [row[1] for row in con.execute(f'PRAGMA table_info("{layer_name}")')]
+        index_columns = [[column] for column in columns 
+                         if (column in GPKG_INDEX_COLUMNS) or column.endswith('slaved')]
+        if ('subsystem_id' in columns) and ('plan_id' in columns):
+            index_columns.append([column for column in SUBSYSTEM_KEYS if column in columns] + ['plan_id'])
+        
+        with con:
+            for index_column in index_columns:
+                index_name = 'idx_{}_{}'.format(layer_name, '_'.join(index_column))
+                index_sql = ', '.join(f'"{column}"' for column in index_column)
+                con.execute(f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{layer_name}" ({index_sql})')
+
+
+def _write_table(df, output_path, table_format, writer=None):
+    """
+    Helper function to export a table to file, one chunk at a time
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Table (or chunk of the table) to export
+    output_path : PosixPath
+        File path to export to, without the file extension
+    table_format : str
+        'csv' or 'parquet'
+        'parquet' requires the optional `pyarrow` package
+    writer : file object or pyarrow.parquet.ParquetWriter, optional
+        Open writer returned by a previous call, to append `df` to
+        Default value is None, which will create a new file
+
+    Returns
+    -------
+    writer : file object or pyarrow.parquet.ParquetWriter
+        Open writer to pass to the next call -> must be closed by the caller
+    """
+    if table_format == 'csv':
+        header = writer is None
+        if writer is None:
+            writer = open(Path(f'{output_path}.csv'), 'w', newline='')
+        df.to_csv(writer, index=False, header=header)
+    elif table_format == 'parquet':
+        table = _to_arrow_table(df)
+        if writer is None:
+            import pyarrow.parquet as pq
+            writer = pq.ParquetWriter(Path(f'{output_path}.parquet'), table.schema)
+        writer.write_table(table.cast(writer.schema))
+    else:
+        raise ValueError(f'Unknown table format: {table_format}')
+    
+    return writer
+
+
+def _iter_lx_chunks(lx_file_path, 
+                    site_index, 
+                    break_at_nonNumeric, 
+                    search_term_intID, 
+                    search_term_subsystem, 
+                    search_term_pp, 
+                    search_term_subsystemData, 
+                    search_limit, 
+                    skip_initial_lines, 
+                    chunk_size, 
+                    error_ints, 
+                    error_subsys,
+                    sites=None,
+                    subsystems=None,
+                    plans=(1, 2, 3, 4),
+                    record_types=RECORD_TYPES):
+    """
+    Helper generator running the LX file parsing pipeline, `chunk_size` sites at a time
+    Only the selected sites, subsystems, plans and record types are parsed
+    See `lx_to_gis` for the parameters
+
+    Yields
+    ------
+    df_plans : pandas.DataFrame
+        Processed LX data of the chunk, in long format (see `_lx_records_to_plans`)
+    plans_xy : numpy.ndarray of float
+        (x, y) coordinates of the site of each row of `df_plans`, NaN for sites without location data
+    """
+    lx_file_path = _as_input(lx_file_path)
+    sites = _as_selection(sites)
+    subsystems = _as_selection(subsystems)
+    
+    ### PART 2A - SUBSYSTEM LINK PLAN DATA
+    # iterate through LX file to extract LP data
+    # this is one row per subsystem, so is kept in memory to join to the PP data
+    # the LP data is only required for the LP and SL layers -> skip if not selected
+    lx_subsys_data = []
+    if ('LP' in record_types) or ('SL' in record_types):
+        subsystems_LP = subsystems
+        if (sites is not None) and (subsystems is None):
+            # only extract the LP data for the subsystems of the selected sites
+            # quick search of the selected sites only, without the PP data
+            subsystems_LP = _as_selection(_lx_site_subsystems(lx_file_path, 
+                                                              break_at_nonNumeric, 
+                                                              search_term_intID, 
+                                                              search_term_subsystem, 
+                                                              search_term_pp, 
+                                                              search_limit, 
+                                                              sites=sites)['subsystem_id'])
+        
+        with _open_lx(lx_file_path) as f:
+            lx_subsys_data = list(_iter_subsys_records(f, 
+                                                       break_at_nonNumeric, 
+                                                       search_term_subsystemData, 
+                                                       search_limit, 
+                                                       skip_initial_lines, 
+                                                       error_subsys,
+                                                       subsystems=subsystems_LP,
+                                                       plans=plans))
+
+    print(f'[INFO] Number of LP plan items identified: {len(lx_subsys_data)}')
+    df_subsys = pd.DataFrame(lx_subsys_data, columns=COLUMNS_SUBSYS_DATA)
+    del lx_subsys_data
+
+    ### PART 2B - INTERSECTION PHASE PLAN DATA
+    # iterate through LX file to extract PP data
+    n_sites = 0
+    first_chunk = True
+    with _open_lx(lx_file_path) as f:
+        int_records = _iter_int_records(f, 
+                                        break_at_nonNumeric, 
+                                        search_term_intID, 
+                                        search_term_subsystem, 
+                                        search_term_pp, 
+                                        search_limit, 
+                                        error_ints,
+                                        sites=sites,
+                                        subsystems=subsystems,
+                                        plans=plans)
+        while True:
+            lx_int_data = list(islice(int_records, chunk_size))
+            if (len(lx_int_data) == 0) and not first_chunk:
+                break
+            first_chunk = False
+            n_sites += len(lx_int_data)
+            
+            ### PART 3 - CONVERT LX DATA TO DATAFRAMES
+            df_plans = _lx_records_to_plans(lx_int_data, df_subsys, plans)
+            del lx_int_data
+            
+            ### PART 4 - LOOK UP SITE LOCATIONS
+            yield df_plans, _lookup_xy(site_index, df_plans['site_id'])
+            
+            if not chunk_size:
+                break
+            print(f'[INFO] Processed {n_sites} sites')
+    
+    print(f'[INFO] Number of PP plan items identified: {n_sites}')
+    print(f'[INFO] Parsed through LX file - relevant data extracted')
+
+
+def _to_arrow_table(df):
+    """
+    Helper function to convert a table to a pyarrow.Table
+    Requires the optional `pyarrow` package
+
+    Parameters
+    ----------
+    df : pandas.DataFrame or gpd.GeoDataFrame
+        Table to convert. Geometry is encoded as WKB.
+
+    Returns
+    -------
+    table : pyarrow.Table
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError('Exporting to parquet or arrow requires the `pyarrow` package')
+    
+    # mixed text / numeric columns (e.g. -1 tag for no data) are stored as text
+    df = df.astype({col: 'str' for col in df.columns if df[col].dtype == object})
+    # encode geometry columns as WKB
+    geometry_columns = [col for col in df.columns if df[col].dtype == 'geometry']
+    df = pd.DataFrame(df).assign(**{col: gpd.GeoSeries(df[col]).to_wkb() for col in geometry_columns})
+    
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _table_to_bytes(df, layer_name, output_format):
+    """
+    Helper function to export a table or GIS layer in memory
+
+    Parameters
+    ----------
+    df : pandas.DataFrame or gpd.GeoDataFrame
+        Table or GIS layer to export
+    layer_name : str
+        Name of the geopackage layer (for 'gpkg')
+    output_format : str
+        'gpkg' (CSV for tables, geopackage for GIS layers) or 'arrow' (Arrow IPC stream)
+
+    Returns
+    -------
+    output : bytes or pyarrow.Buffer
+    """
+    if output_format == 'gpkg':
+        if isinstance(df, gpd.GeoDataFrame):
+            buffer = io.BytesIO()
+            df.to_file(buffer, driver='GPKG', layer=layer_name)
+            return buffer.getvalue()
+        return df.to_csv(index=False).encode()
+    elif output_format == 'arrow':
+        import pyarrow as pa
+        table = _to_arrow_table(df)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue()
+    else:
+        raise ValueError(f'Unknown output format: {output_format}')
+
+
+# environment variable to turn on profiling of `lx_to_gis` runs, e.g. SCATSUTILITIES_PROFILE=1
+PROFILE_ENV_VAR = 'SCATSUTILITIES_PROFILE'
+
+# number of hot functions and allocation sites in the profiling summary of each stage
+PROFILE_TOP_N = 20
+
+
+def _start_profile(profile):
+    """
+    Helper function to start profiling a run, if turned on by `profile` or the `PROFILE_ENV_VAR` environment variable
+
+    Parameters
+    ----------
+    profile : bool or None
+        Turn profiling on or off. None uses the `PROFILE_ENV_VAR` environment variable
+
+    Returns
+    -------
+    profile_data : dict or None
+        Profiling data of each stage (see `_profile_stage`), None if profiling is turned off
+    """
+    if profile is None:
+        profile = os.environ.get(PROFILE_ENV_VAR, '').lower() not in ('', '0', 'false', 'no')
+    if not profile:
+        return None
+    
+    # only stop tracing memory at the end if started here
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    return {'stages': {}, 'started_tracing': started_tracing, 'start_time': time.perf_counter()}
+
+
+def _traced_memory_by_line():
+    """
+    Helper function to take a snapshot of the memory traced by tracemalloc, totalled by source line
+    The memory used by tracemalloc itself (e.g. the statistics of earlier snapshots) is excluded
+
+    Returns
+    -------
+    statistics : list of tracemalloc.Statistic
+        Size and count of the traced memory blocks of each source line
+    """
+    snapshot = tracemalloc.take_snapshot()
+    return snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)]).statistics('lineno')
+
+
+def _memory_allocated(statistics_start, statistics_end):
+    """
+    Helper function to get the memory allocated (and not released) between two snapshots, by source line
+    (see `_traced_memory_by_line`)
+
+    Returns
+    -------
+    allocated : int
+        Total size of the memory blocks allocated, in bytes
+    top_allocations : list of tuple
+        ((filename, lineno), size, count) of the `PROFILE_TOP_N` source lines with the most memory allocated
+    """
+    allocations = {}
+    for sign, statistics in ((-1, statistics_start), (1, statistics_end)):
+        for stat in statistics:
+            line = (stat.traceback[0].filename, stat.traceback[0].lineno)
+            size, count = allocations.get(line, (0, 0))
+            allocations[line] = (size + sign * stat.size, count + sign * stat.count)
+    # only the top source lines are kept -> the profiling data of each stage stays small
+    top_allocations = sorted(allocations.items(), key=lambda item: item[1][0], reverse=True)[:PROFILE_TOP_N]
+    
+    return (sum(size for size, _ in allocations.values()), 
+            [(line, size, count) for line, (size, count) in top_allocations])
+
+
+@contextmanager
+def _profile_stage(profile_data, stage):
+    """
+    Helper context manager to profile a stage of a run (CPU time with cProfile, memory with tracemalloc)
+    A stage run several times (e.g. once per chunk) is added to the profile of its earlier runs
+    Does nothing if profiling is turned off
+
+    Parameters
+    ----------
+    profile_data : dict or None
+        Profiling data, see `_start_profile`
+    stage : str
+        Name of the stage
+    """
+    if profile_data is None:
+        yield
+        return
+    
+    stage_data = profile_data['stages'].setdefault(stage, {'profiler': cProfile.Profile(),
+                                                           'calls': 0,
+                                                           'wall_time': 0.0,
+                                                           'peak_memory': 0,
+                                                           'allocated': 0,
+                                                           'top_allocations': []})
+    # memory by source line at the start of the first run of the stage
+    # note: each snapshot copies all the traced memory blocks -> only taken for the first run, and only 
+    # the statistics by source line are kept (their memory is excluded from the peak memory)
+    first_run = stage_data['calls'] == 0
+    profile_memory = 0
+    if first_run:
+        traced_memory = tracemalloc.get_traced_memory()[0]
+        memory_start = _traced_memory_by_line()
+        profile_memory = tracemalloc.get_traced_memory()[0] - traced_memory
+    tracemalloc.reset_peak()
+    start_time = time.perf_counter()
+    stage_data['profiler'].enable()
+    try:
+        yield
+    finally:
+        stage_data['profiler'].disable()
+        stage_data['wall_time'] += time.perf_counter() - start_time
+        stage_data['calls'] += 1
+        stage_data['peak_memory'] = max(stage_data['peak_memory'], tracemalloc.get_traced_memory()[1] - profile_memory)
+        if first_run:
+            # memory allocated (and not released) by the first run of the stage, by source line
+            stage_data['allocated'], stage_data['top_allocations'] = _memory_allocated(memory_start, 
+                                                                                       _traced_memory_by_line())
+
+
+def _profile_iter(profile_data, stage, iterable):
+    """
+    Helper generator to profile the work done by a generator (e.g. parsing the LX file) as a stage of a run,
+    one item at a time (see `_profile_stage`)
+    """
+    iterator = iter(iterable)
+    while True:
+        with _profile_stage(profile_data, stage):
+            items = list(islice(iterator, 1))
+        if not items:
+            return
+        # no reference to the item is kept here -> it can be released by the caller (e.g. each chunk)
+        yield items.pop()
+
+
+def _write_profile(profile_data, output_folderPath, name):
+    """
+    Helper function to export the profiling data of a run, and stop profiling
+
+    Parameters
+    ----------
+    profile_data : dict or None
+        Profiling data, see `_start_profile`. Nothing is exported if None
+    output_folderPath : str or PosixPath
+        Folder path to export the profiling data to
+    name : str
+        Name used in the exported file names
+
+    Returns
+    -------
+    summary : dict or None
+        Summary of each stage, as exported to `LX_profile_*.json`
+
+    Notes
+    -----
+    Exports the following files to the `LX_profile_*` folder
+    
+    - summary.json : for each stage (in order of first run)
+        - calls : number of runs of the stage
+        - wall_time : total time, in seconds
+        - peak_memory : peak traced memory during the stage, in bytes
+        - allocated : memory allocated (and not released) by the first run of the stage, in bytes
+        - top_functions : `PROFILE_TOP_N` functions with the most time spent in the function itself
+        - top_allocations : `PROFILE_TOP_N` source lines with the most memory allocated by the first run
+    - `{stage}.prof` : cProfile data of each stage, which can be read with `pstats.Stats`
+    """
+    if profile_data is None:
+        return None
+    if profile_data['started_tracing']:
+        tracemalloc.stop()
+    
+    profile_folderPath = Path(output_folderPath, f'LX_profile_{name}')
+    make_output_dir(profile_folderPath)
+    
+    summary = {'total_time': time.perf_counter() - profile_data['start_time'], 'stages': {}}
+    for stage, stage_data in profile_data['stages'].items():
+        stage_data['profiler'].dump_stats(profile_folderPath/f'{stage}.prof')
+        
+        function_stats = pstats.Stats(stage_data['profiler']).stats
+        hot_functions = sorted(function_stats.items(), key=lambda item: item[1][2], reverse=True)[:PROFILE_TOP_N]
+        summary['stages'][stage] = {
+            'calls': stage_data['calls'],
+            'wall_time': stage_data['wall_time'],
+            'peak_memory': stage_data['peak_memory'],
+            'allocated': stage_data['allocated'],
+            'top_functions': [{'function': pstats.func_std_string(function), 
+                               'ncalls': stats[1], 
+                               'tottime': stats[2], 
+                               'cumtime': stats[3]} 
+                              for function, stats in hot_functions],
+            'top_allocations': [{'location': f'{filename}:{lineno}', 'size': size, 'count': count} 
+                                for (filename, lineno), size, count in stage_data['top_allocations']]}
+    
+    with open(profile_folderPath/'summary.json', 'w') as f:
+        json.dump(summary, f, indent=2)
+    
+    for stage, stage_summary in summary['stages'].items():
+        print(f'[INFO] Profile of {stage}: {stage_summary["wall_time"]:.3f} s, '
+              f'peak memory {stage_summary["peak_memory"] / 1e6:.1f} MB')
+    print(f'[INFO] Profiling data exported to: {profile_folderPath}')
+    
+    return summary
+
+
+def _export_lx_chunks(lx_chunks, 
+                      site_index, 
+                      lx_fileName, 
+                      output_folderPath_LX_processed, 
+                      output_gis_folderPath, 
+                      chunk_size, 
+                      processed_format, 
+                      plans=(1, 2, 3, 4),
+                      record_types=RECORD_TYPES,
+                      subsystem_sites=None,
+                      profile_data=None):
+    """
+    Helper function exporting the processed LX data, one chunk at a time, to the processed data 
+    tables and the geopackages of each plan
+    See `lx_to_gis` for the parameters
+
+    Parameters
+    ----------
+    lx_chunks : generator
+        Chunks of processed LX data (see `_iter_lx_chunks`), closed once exported
+    site_index : tuple
+        SCATS site locations (see `_read_scats_sites`)
+    lx_fileName : str
+        Name of the LX file (without extension), used in the exported file names
+    subsystem_sites : pandas.Series, optional
+        Number of sites of each subsystem in `lx_chunks`, indexed by subsystem (see `_subsystem_keys`)
+        The link metric summary and the corridors of each subsystem are exported as soon as all its sites 
+        are processed, so only the totals of the subsystems in progress are kept in memory (streaming mode)
+        Default value is None, which will export all subsystems once all chunks are processed
+    profile_data : dict, optional
+        Profiling data of the run (see `_start_profile`), with a stage for each step
+        Default value is None, which will not profile the run
+
+    Returns
+    -------
+    df : gpd.GeoDataFrame
+        Processed LX data, None if `chunk_size` is set
+    """
+    if output_folderPath_LX_processed:
+        # check if directories exist; create if not
+        make_output_dir(output_folderPath_LX_processed)
+    if output_gis_folderPath:
+        # check if directories exist; create if not
+        make_output_dir(output_gis_folderPath)
+    
+    df_output = None
+    processed_writer = None # open file for processed LX data export
+    plans_writer = None # open file for normalised plan data export
+    noData_writer = None # open file for sites with no geometry data
+    layers_written = set() # geopackage layers already created by this run
+    linkMetrics_writer = None # open file for the link metric summary
+    link_totals = None # link metric totals of the subsystems not exported yet
+    corridor_totals = None # subsystem corridor totals of the subsystems not exported yet
+    has_links = ('LP' in record_types) or ('SL' in record_types)
+    export_link_metrics = bool(output_folderPath_LX_processed) and has_links
+    export_corridors = bool(output_gis_folderPath) and has_links
+    linkMetrics_path = Path(output_folderPath_LX_processed or '', f'LX_linkMetrics_{lx_fileName}')
+    remaining_sites = subsystem_sites # number of sites of each subsystem not processed yet
+    
+    try:
+        # note: parsing includes `pp_breakdown` / `lp_breakdown` and the site location lookup
+        for df_plans, plans_xy in _profile_iter(profile_data, 'parse', lx_chunks):
+            finished = None
+            if remaining_sites is not None:
+                # subsystems with all their sites in this chunk or earlier chunks
+                finished, remaining_sites = _finished_subsystems(df_plans, remaining_sites)
+            
+            with _profile_stage(profile_data, 'processed_tables'):
+                # the wide table (one row per site) is derived from the normalised plan data
+                df = _plans_to_wide(df_plans)
+                if output_folderPath_LX_processed:
+                    # export files
+                    processed_writer = _write_table(df, 
+                                                    Path(output_folderPath_LX_processed, f'LX_processed_{lx_fileName}'), 
+                                                    processed_format, 
+                                                    processed_writer)
+                    plans_writer = _write_table(df_plans, 
+                                                Path(output_folderPath_LX_processed, f'LX_plans_{lx_fileName}'), 
+                                                processed_format, 
+                                                plans_writer)
+                
+                if not chunk_size:
+                    # keep the full processed data (with point geometry) to return
+                    df_output = gpd.GeoDataFrame(df, geometry=_points(_lookup_xy(site_index, df['site_id']), site_index[2]))
+                
+                # extract sites with no geometry data for review
+                has_location = ~np.isnan(plans_xy).any(axis=1)
+                if output_gis_folderPath:
+                    # export file
+                    noData_writer = _write_table(_plans_to_wide(df_plans.loc[~has_location]).assign(geometry=None), 
+                                                 Path(output_gis_folderPath)/'gdf_lx_noGeometry', 
+                                                 'csv', 
+                                                 noData_writer)
+                del df
+            # delete the sites without geometry data
+            # note: all rows of a site are deleted together -> the PP and LP rows stay aligned
+            df_plans = df_plans.loc[has_location]
+            plans_xy = plans_xy[has_location]
+            
+            ### PART 5 - EXPORT TO GPKG
+            with _profile_stage(profile_data, 'links'):
+                # build the links between sites once, and compute the link metrics for all plans
+                links = _build_links(df_plans, site_index, record_types)
+                metrics = _link_metrics(df_plans, links, record_types)
+                if export_link_metrics:
+                    # add to the link metric totals of the earlier chunks
+                    link_totals = _add_link_totals([link_totals, _summarise_link_metrics(metrics)])
+                if export_corridors:
+                    # add to the corridor totals of the earlier chunks
+                    # note: subsystems can span several chunks -> the corridors are exported once all 
+                    # the sites of the subsystem are processed
+                    corridor_totals = _add_corridor_totals([corridor_totals, 
+                                                            _corridor_totals(df_plans, links, metrics, record_types)])
+            # extract data by plans (1..4), in a single pass
+            plan_layers = _iter_plan_layers(df_plans, plans_xy, site_index[2], links, metrics, plans, record_types)
+            for plan_id, layers in groupby(_profile_iter(profile_data, 'layers', plan_layers), key=lambda layer: layer[0]):
+                print(f'[INFO] Exporting geopackage for Plan ID: {plan_id}')
+                for _, layer_name, gdf_export in layers:
+                    # export to file by plan_id
+                    if output_gis_folderPath:
+                        with _profile_stage(profile_data, f'to_file_{layer_name}'):
+                            _write_layer(gdf_export, 
+                                         Path(output_gis_folderPath)/f'LX_plan{plan_id}_{lx_fileName[:-3]}.gpkg', 
+                                         layer_name, 
+                                         layers_written)
+                print(f'[INFO] DONE Exporting geopackage for Plan ID: {plan_id}')
+            
+            # combined layers of all plans
+            if output_gis_folderPath:
+                all_plans_layers = _iter_all_plans_layers(df_plans, plans_xy, site_index[2], links, metrics, record_types)
+                for layer_name, gdf_export in _profile_iter(profile_data, 'layers', all_plans_layers):
+                    with _profile_stage(profile_data, f'to_file_{layer_name}'):
+                        _write_layer(gdf_export, 
+                                     Path(output_gis_folderPath)/f'LX_allPlans_{lx_fileName[:-3]}.gpkg', 
+                                     layer_name, 
+                                     layers_written)
+            
+            # export the link metric summary and the corridors of the finished subsystems
+            if export_link_metrics and (finished is not None):
+                link_totals, linkMetrics_writer = _export_link_metrics(link_totals, 
+                                                                       finished, 
+                                                                       linkMetrics_path, 
+                                                                       processed_format, 
+                                                                       linkMetrics_writer)
+            if export_corridors and (finished is not None):
+                corridor_totals = _export_corridors(corridor_totals, 
+                                                    finished, 
+                                                    site_index, 
+                                                    output_gis_folderPath, 
+                                                    lx_fileName, 
+                                                    layers_written, 
+                                                    plans, 
+                                                    profile_data)
+        
+        # export the link metric summary of the subsystems not exported yet (all subsystems if not streaming)
+        if export_link_metrics and (link_totals is not None):
+            _, linkMetrics_writer = _export_link_metrics(link_totals, 
+                                                         None, 
+                                                         linkMetrics_path, 
+                                                         processed_format, 
+                                                         linkMetrics_writer)
+    finally:
+        # close the LX file and any open export files
+        lx_chunks.close()
+        for writer in (processed_writer, plans_writer, noData_writer, linkMetrics_writer):
+            if writer is not None:
+                writer.close()
+    
+    # export the subsystem corridors not exported yet (all subsystems if not streaming)
+    if corridor_totals is not None:
+        _export_corridors(corridor_totals, 
+                          None, 
+                          site_index, 
+                          output_gis_folderPath, 
+                          lx_fileName, 
+                          layers_written, 
+                          plans, 
+                          profile_data)
+    
+    # index the geopackage layers, once all chunks are written
+    with _profile_stage(profile_data, 'gpkg_indexes'):
+        for gpkg_path, layer_name in sorted(layers_written):
+            _index_gpkg_layer(gpkg_path, layer_name)
+    
+    return df_output
+
+
 def lx_to_gis(lx_file_path, 
               scats_sites_path, 
               col_scats_x='Longitude', 
@@ -240,547 +2279,1487 @@ def lx_to_gis(lx_file_path,
               search_term_pp='PP',
               search_term_subsystemData='SS=',
               search_limit=20,
-              skip_initial_lines=10):
+              skip_initial_lines=10,
+              chunk_size=None,
+              processed_format='csv',
+              subsystems=None,
+              sites=None,
+              plans=(1, 2, 3, 4),
+              record_types=RECORD_TYPES,
+              profile=None):
+    """
+    Reads SCATS LX file and exports Phase Plan and Link Plan data as table and geopackages.
+    
+    Used to process SCATS LX files, extract the Phase Plan (PP) and Link Plan (LP) data. This data is
+    processed and converted into a dataframe table, and also exported as a multi-layer geopackage. 
+    
+    Parameters
+    ----------
+    lx_file_path : str or PosixPath
+        File path to the SCATS LX file
+        
+    scats_sites_path : str or PosixPath
+        File path to the csv file identifying the SCATS Site ID number, and the associated
+        latitude and longitude coordinates of each site. 
+        Example for New South Wales, Australia is available from:
+        https://opendata.transport.nsw.gov.au/dataset/traffic-lights-location
+        (as at 8 January 2021)
+    
+    col_scats_x : str, optional
+        Name of column in `scats_sites_path` with the x-coordinate data for each 
+        SCATS site (by Site ID)
+        Default value is 'Longitude'
+        
+    col_scats_y : str, optional
+        Name of column in `scats_sites_path` with the y-coordinate data for each 
+        SCATS site (by Site ID)
+        Default value is 'Latitude'
+    
+    scats_input_crs_id : int, optional
+        Coordinate system of the x,y coordinates from `scats_sites_path`, as EPSG id number
+        Default value is 4326, which refers to EPSG:4326 and the WGS 84 projection system
+        (i.e. conventional lat/long coordinates)
+        
+    scats_projected_crs_id : int, optional
+        Coordinate system to transfer the `scats_sites_path` coordinate data into, as EPSG id number
+        It is STRONGLY RECOMMENDED to use a project coordinate system (e.g. GDA2020 MGA Zone xx, or GDA2020 Lambert)
+        Default value is 8058, which refers to EPSG:8058 and the GDA2020 NSW Lambert projection system
+        This is a projected coordinate system
+        
+    output_folderPath_LX_processed : str or PosixPath, optional
+        Folder path to export the processed LX data to
+        Default value is None, which will not export a file
+    
+    output_gis_folderPath : str or PosixPath, optional
+        Folder path to export the process LX data as GIS geopackages (.gpkg)
+        Default value is None, which will not export a file
+
+    break_at_nonNumeric : bool, optional
+        Tag to decide if the code should break at each invalid Site ID or Subsystem ID to allow user
+        to review and investigate LX file.
+        If set to False, the code will record a '-2' code in the `connected_site` output data 
+        Default value is True, which will cause the code to break everytime it encounters an 
+        invalid Site ID or Subsystem ID.
+    
+    search_term_intID : str, optional
+        For debugging only
+        Search term to identify lines with the Site ID number (as string)
+        Default value is 'INT=', which is the search term
+        
+    search_term_subsystem : str, optional
+        For debugging only
+        Search term to identify lines with the Subsystem ID number applicable to the Site ID
+        Default value is 'S#=', which is the search term
+        
+    search_term_pp : str, optional
+        For debugging only
+        Search term to identify lines with the Phase Plan (PP) (as string)
+        Default value is 'PP', which is the search term
+        
+    search_term_subsystemData : str, optional
+        For debugging only
+        Search term to identify lines with the Subsystem ID number 
+        (as string) containing the Link Plan (LP) data
+        Default value is 'SS=', which is the search term
+        
+    search_limit : int, optional
+        For debugging only
+        Maximum number of lines to search in LX file for PP and LP data 
+        (after finding the Site ID or Subsystem ID)
+        Default value is 20, which will search through a maximum of 20 lines
+        
+    skip_initial_lines : int, optional
+        For debugging only
+        Used in `search_term_subsystemData` search to skip over the metadata in initial rows
+        Default value is 10, which will skip the initial 10 lines of the LX file
+    
+    chunk_size : int, optional
+        Number of sites to process at a time (streaming export mode)
+        If set, the LX file is processed `chunk_size` sites at a time: each chunk is parsed, joined to the 
+        site locations, converted to geometry and appended to the exported files before moving on to the 
+        next chunk. Peak memory use then mostly depends on `chunk_size` rather than the size of the LX file, 
+        which is recommended for very large (e.g. statewide) networks.
+        Note that memory still grows slowly with the size of the network: the LP data and the number of 
+        sites left to process of each subsystem are kept for the whole run (about 100 bytes per subsystem), 
+        as well as the SCATS site locations, and pyogrio keeps a few hundred bytes for each layer write 
+        (i.e. each chunk).
+        Exported rows are sorted by `site_id` within each chunk only (i.e. in LX file order overall)
+        Default value is None, which will process the whole LX file at once
+    
+    processed_format : str, optional
+        File format of the processed LX data exported to `output_folderPath_LX_processed`
+        Either 'csv' or 'parquet' (requires the optional `pyarrow` package)
+        Default value is 'csv'
+    
+    subsystems : list of int, optional
+        Subsystem IDs to process. The `INT=` and `SS=` blocks of other subsystems are skipped 
+        without being processed.
+        Default value is None, which will process all subsystems
+    
+    sites : list of int, optional
+        Site IDs to process. The `INT=` blocks of other sites are skipped without being processed, 
+        and only the `SS=` blocks of the subsystems of the selected sites are processed.
+        Default value is None, which will process all sites
+    
+    plans : tuple of int, optional
+        Plan IDs (1..4) to process and export. The PP and LP data of other plans is not processed, 
+        and is tagged as -1 (no data) in the processed LX data.
+        Default value is (1, 2, 3, 4)
+    
+    record_types : tuple of str, optional
+        Types of GIS layers to export: 'PP', 'LP' and/or 'SL'
+        If only 'PP' is selected, the `SS=` blocks (LP data) are not processed at all.
+        Note that the SL layers only include sites with an LP link, so require the LP data.
+        Default value is ('PP', 'LP', 'SL')
+    
+    profile : bool, optional
+        Profile the run: CPU time (cProfile) and memory (tracemalloc) of each stage of the pipeline 
+        (parsing, including `pp_breakdown` / `lp_breakdown`, processed tables, links, layers, 
+        each geopackage layer export and indexes), exported to the `LX_profile_*` folder next to 
+        the outputs (see Notes)
+        Note that profiling slows the run down, as a memory snapshot is taken at the start and end of each stage
+        Default value is None, which will profile the run if the `SCATSUTILITIES_PROFILE` environment 
+        variable is set (e.g. SCATSUTILITIES_PROFILE=1)
+    
+    Returns
+    -------
+    df : pandas.DataFrame
+        Dataframe of processed LX data, with:
+        - INT_ID, SUBSYSTEM_ID, PP1, PP2, PP3, PP4
+        - SUBSYSTEM_ID, LP1, LP2, LP3, LP4
+        None if `chunk_size` is set (the data is only exported to file)
+    
+    error_ints : ::list:: of str
+        List of Site IDs with invalid data
+        Format of ['Site ID', 'Error message']
+        
+    error_subsys : ::list:: of str
+        List of Subsystem IDs with invalid data
+        Format of ['Site ID', 'Error message']
+        
+    Notes
+    -----
+    Exports the following files
+    
+    - df : CSV file (or Parquet file, see `processed_format`)
+    - normalised plan data, one row per site, plan and record type (PP or LP) : CSV file (or Parquet file)
+    - GIS compatible geopackage (gpkg) files, with an R-tree spatial index and SQL attribute indexes 
+      on the Site ID, Subsystem ID and `*_slaved` columns of each layer, for
+        - PP1
+        - PP2
+        - PP3
+        - PP4
+        - LP1
+        - LP2
+        - LP3
+        - LP4
+        - SL1
+        - SL2
+        - SL3
+        - SL4
+        - SS1, SS2, SS3, SS4 (`SSx_corridors` layer of each plan geopackage): LP and SL links of each 
+          subsystem dissolved into one MultiLineString, with the site count, number and total length of 
+          the links, slaved count and number of broken links (to a site without location data)
+        - all plans combined (`LX_allPlans_*.gpkg`): `allPlans_sites` (PP and LP data of each site and plan) 
+          and `allPlans_links` (LP and SL links of each site and plan), with `plan_id` and `record_type` 
+          columns and an index on (subsystem_id, plan_id)
+    
+    If profiling is turned on (see `profile`), also exports the `LX_profile_*` folder to 
+    `output_gis_folderPath` (or `output_folderPath_LX_processed`, or the current folder), with
+    
+    - summary.json : wall time, peak memory and allocated memory of each stage, with the top 20 functions 
+      (by time spent in the function) and top 20 allocation sites (by memory allocated, in the first run 
+      of the stage)
+    - `{stage}.prof` : cProfile data of each stage, which can be read with `pstats.Stats`
+    
+    Note that the `SLx` series is not always outputted, as sites are rarely slaved (i.e. hard-fixed) to an
+    adjacent site.
+    
+    QGIS styles are available from the Github repository:
+    https://github.com/johntrieu91/scatsutilities
+    
+    """
+    ### PART 1 - READ IN DATA
+    # Read LX file
+    # NOTE: the LX file is streamed line by line (see `_iter_lx_windows`),
+    # with file read only where required later in the code
+    _check_selection(plans, record_types)
+    lx_fileName = _lx_file_stem(lx_file_path)
+    # profile each stage of the run, if turned on
+    profile_data = _start_profile(profile)
+    
+    # Read SCATS site location data
+    with _profile_stage(profile_data, 'read_sites'):
+        site_index = _read_scats_sites(scats_sites_path, 
+                                       col_scats_x, 
+                                       col_scats_y, 
+                                       scats_input_crs_id, 
+                                       scats_projected_crs_id)
+    
+    ### PART 2 - EXTRACT LX FILE DATA
+    # initialise lists
+    error_ints = [] # stores any intersection PP with errors
+    error_subsys = [] # stores any subsystem LP with errors
+    
+    subsystem_sites = None
+    if chunk_size:
+        # number of sites of each subsystem -> the subsystem corridors are exported as soon as all the 
+        # sites of a subsystem are processed (quick search of the `INT=` blocks, without the PP data)
+        lx_file_path = _as_input(lx_file_path)
+        with _profile_stage(profile_data, 'subsystem_sites'):
+            subsystem_sites = _lx_site_subsystems(lx_file_path, 
+                                                  break_at_nonNumeric, 
+                                                  search_term_intID, 
+                                                  search_term_subsystem, 
+                                                  search_term_pp, 
+                                                  search_limit, 
+                                                  sites=sites, 
+                                                  subsystems=subsystems).groupby('subsystem_id').size()
+    
+    # in streaming mode, this is processed `chunk_size` sites at a time
+    lx_chunks = _iter_lx_chunks(lx_file_path, 
+                                site_index, 
+                                break_at_nonNumeric, 
+                                search_term_intID, 
+                                search_term_subsystem, 
+                                search_term_pp, 
+                                search_term_subsystemData, 
+                                search_limit, 
+                                skip_initial_lines, 
+                                chunk_size, 
+                                error_ints, 
+                                error_subsys,
+                                sites=sites,
+                                subsystems=subsystems,
+                                plans=plans,
+                                record_types=record_types)
+    
+    # process and export each chunk
+    df_output = _export_lx_chunks(lx_chunks, 
+                                  site_index, 
+                                  lx_fileName, 
+                                  output_folderPath_LX_processed, 
+                                  output_gis_folderPath, 
+                                  chunk_size, 
+                                  processed_format, 
+                                  plans=plans, 
+                                  record_types=record_types,
+                                  subsystem_sites=subsystem_sites,
+                                  profile_data=profile_data)
+    
+    # export the profiling data
+    _write_profile(profile_data, output_gis_folderPath or output_folderPath_LX_processed or Path.cwd(), lx_fileName)
+    
+    return df_output, error_ints, error_subsys
+
+
+def lx_to_memory(lx_file, 
+                 scats_sites, 
+                 col_scats_x='Longitude', 
+                 col_scats_y='Latitude', 
+                 scats_input_crs_id=4326, 
+                 scats_projected_crs_id=8058, 
+                 output_format=None,
+                 break_at_nonNumeric=True,
+                 search_term_intID='INT=',
+                 search_term_subsystem='S#=',
+                 search_term_pp='PP',
+                 search_term_subsystemData='SS=',
+                 search_limit=20,
+                 skip_initial_lines=10,
+                 subsystems=None,
+                 sites=None,
+                 plans=(1, 2, 3, 4),
+                 record_types=RECORD_TYPES):
+    """
+    Reads SCATS LX data and returns the Phase Plan and Link Plan outputs in memory.
+    
+    In-memory version of `lx_to_gis`: the LX data and SCATS site locations can be given as bytes or 
+    file objects, and the outputs are returned instead of being exported to folders, so no files 
+    are read from or written to disk. 
+    The function does not keep any state between calls, and can be run concurrently (e.g. in a thread pool).
+    
+    Parameters
+    ----------
+    lx_file : str, PosixPath, bytes or file object
+        SCATS LX file: file path, contents (as bytes), or file object opened in text or binary mode
+        File objects are read from their current position, and rewound to it after use
+    
+    scats_sites : str, PosixPath, bytes or file object
+        SCATS site locations csv file (see `scats_sites_path` in `lx_to_gis`): 
+        file path, contents (as bytes), or file object
+    
+    col_scats_x : str, optional
+        See `lx_to_gis`
+        Default value is 'Longitude'
+        
+    col_scats_y : str, optional
+        See `lx_to_gis`
+        Default value is 'Latitude'
+    
+    scats_input_crs_id : int, optional
+        See `lx_to_gis`
+        Default value is 4326
+        
+    scats_projected_crs_id : int, optional
+        See `lx_to_gis`
+        Default value is 8058
+    
+    output_format : str, optional
+        Format of the returned outputs:
+        - None : pandas.DataFrame (tables) and gpd.GeoDataFrame (layers)
+        - 'gpkg' : CSV file contents (tables) and geopackage file contents (layers), as bytes
+          Each layer is returned as a separate single-layer geopackage
+        - 'arrow' : Arrow IPC stream buffers, with geometry encoded as WKB 
+          (requires the optional `pyarrow` package)
+        Default value is None
+    
+    break_at_nonNumeric, search_term_intID, search_term_subsystem, search_term_pp, 
+    search_term_subsystemData, search_limit, skip_initial_lines : optional
+        See `lx_to_gis`
+    
+    subsystems, sites, plans, record_types : optional
+        Selection of the LX data to process, see `lx_to_gis`
+    
+    Returns
+    -------
+    outputs : dict
+        Outputs by name, matching the files exported by `lx_to_gis`:
+        - 'LX_processed' : processed LX data
+        - 'LX_plans' : processed LX data in long format, one row per site, plan and record type
+        - 'gdf_lx_noGeometry' : sites with no location data
+        - 'LX_linkMetrics' : summary of the link metrics by subsystem (if LP or SL layers are selected)
+        - 'PPx_data', 'LPx_data', 'SLx_data' : GIS layers of each selected plan, if not empty
+        - 'SSx_corridors' : subsystem corridors of each selected plan (if LP or SL layers are selected)
+        - 'allPlans_sites', 'allPlans_links' : combined GIS layers of all selected plans, if not empty
+    
+    error_ints : ::list:: of str
+        See `lx_to_gis`
+        
+    error_subsys : ::list:: of str
+        See `lx_to_gis`
+    """
+    _check_selection(plans, record_types)
+    # Read SCATS site location data
+    site_index = _read_scats_sites(scats_sites, 
+                                   col_scats_x, 
+                                   col_scats_y, 
+                                   scats_input_crs_id, 
+                                   scats_projected_crs_id)
+    
+    # initialise lists
+    outputs = {}
+    error_ints = [] # stores any intersection PP with errors
+    error_subsys = [] # stores any subsystem LP with errors
+    
+    # process the whole LX file at once -> single chunk
+    for df_plans, plans_xy in _iter_lx_chunks(lx_file, 
+                                              site_index, 
+                                              break_at_nonNumeric, 
+                                              search_term_intID, 
+                                              search_term_subsystem, 
+                                              search_term_pp, 
+                                              search_term_subsystemData, 
+                                              search_limit, 
+                                              skip_initial_lines, 
+                                              None, 
+                                              error_ints, 
+                                              error_subsys,
+                                              sites=sites,
+                                              subsystems=subsystems,
+                                              plans=plans,
+                                              record_types=record_types):
+        outputs['LX_processed'] = _plans_to_wide(df_plans)
+        outputs['LX_plans'] = df_plans
+        # extract sites with no geometry data for review
+        has_location = ~np.isnan(plans_xy).any(axis=1)
+        outputs['gdf_lx_noGeometry'] = _plans_to_wide(df_plans.loc[~has_location]).assign(geometry=None)
+        # delete the sites without geometry data
+        df_plans = df_plans.loc[has_location]
+        plans_xy = plans_xy[has_location]
+        
+        # build the links between sites once, and compute the link metrics for all plans
+        links = _build_links(df_plans, site_index, record_types)
+        metrics = _link_metrics(df_plans, links, record_types)
+        if ('LP' in record_types) or ('SL' in record_types):
+            outputs['LX_linkMetrics'] = _link_metrics_summary([_summarise_link_metrics(metrics)])
+        # extract data by plans (1..4), in a single pass
+        for _, layer_name, gdf_export in _iter_plan_layers(df_plans, plans_xy, site_index[2], links, metrics, 
+                                                           plans, record_types):
+            outputs[layer_name] = gdf_export
+        # subsystem corridors of each plan
+        if ('LP' in record_types) or ('SL' in record_types):
+            corridors = _subsystem_corridors(_corridor_totals(df_plans, links, metrics, record_types), site_index)
+            for _, layer_name, gdf_export in _iter_corridor_layers(corridors, plans):
+                outputs[layer_name] = gdf_export
+        # combined layers of all plans
+        for layer_name, gdf_export in _iter_all_plans_layers(df_plans, plans_xy, site_index[2], 
+                                                             links, metrics, record_types):
+            outputs[layer_name] = gdf_export
+    
+    if output_format:
+        outputs = {name: _table_to_bytes(table, name, output_format) for name, table in outputs.items()}
+    
+    return outputs, error_ints, error_subsys
+
+
+### MERGING LX FILES (MULTIPLE REGIONAL COMPUTERS)
+
+
+# precedence of duplicated sites when merging LX files (see `merge_lx_to_gis`)
+MERGE_PRECEDENCE = ('first', 'last')
+
+
+def _merge_lx_sites(lx_file_paths, 
+                    lx_file_names, 
+                    precedence, 
+                    break_at_nonNumeric, 
+                    search_term_intID, 
+                    search_term_subsystem, 
+                    search_term_pp, 
+                    search_limit, 
+                    sites=None,
+                    subsystems=None):
+    """
+    Helper function to list the sites of several LX files, and find the LX file each site is kept from
+    Quick search of the `INT=` blocks of each LX file (see `_lx_site_subsystems`), before parsing them
+    See `merge_lx_to_gis` for the parameters
+
+    Returns
+    -------
+    df_sites : pandas.DataFrame
+        One row per site of each LX file, in order of `lx_file_paths` then LX file order, with:
+        - site_id, subsystem_id : Site ID and its Subsystem ID in the LX file
+        - lx_file : name of the LX file (see `lx_file_names`)
+        - lx_rank : position of the LX file in `lx_file_paths`
+        - kept : True for the LX file the site is kept from (first or last in `lx_file_paths`)
+    """
+    frames = []
+    for rank, (lx_file_path, lx_fileName) in enumerate(zip(lx_file_paths, lx_file_names)):
+        frames.append(_lx_site_subsystems(lx_file_path, 
+                                          break_at_nonNumeric, 
+                                          search_term_intID, 
+                                          search_term_subsystem, 
+                                          search_term_pp, 
+                                          search_limit, 
+                                          sites=sites, 
+                                          subsystems=subsystems)
+                      .assign(lx_file=lx_fileName, lx_rank=rank))
+    df_sites = pd.concat(frames, ignore_index=True)
+    
+    # keep each site from the LX file with precedence for its Site ID
+    site_rank = (df_sites
+                 .groupby('site_id')['lx_rank']
+                 .transform('min' if precedence == 'first' else 'max'))
+    df_sites['kept'] = (df_sites['lx_rank'] == site_rank).to_numpy()
+    
+    return df_sites
+
+
+def _iter_merged_lx_chunks(lx_file_paths, 
+                           lx_file_names, 
+                           site_index, 
+                           df_sites, 
+                           break_at_nonNumeric, 
+                           search_term_intID, 
+                           search_term_subsystem, 
+                           search_term_pp, 
+                           search_term_subsystemData, 
+                           search_limit, 
+                           skip_initial_lines, 
+                           chunk_size, 
+                           error_ints, 
+                           error_subsys, 
+                           subsystems=None,
+                           plans=(1, 2, 3, 4),
+                           record_types=RECORD_TYPES):
+    """
+    Helper generator parsing several LX files and merging them into a single network
+    See `merge_lx_to_gis` for the parameters
+    
+    Each LX file is parsed separately (the LP data of a site is that of its subsystem in the same LX file), 
+    only for the sites kept from it (see `_merge_lx_sites`), and all link targets are looked up in the 
+    shared `site_index`.
+    In streaming mode (`chunk_size`), each LX file is processed `chunk_size` sites at a time, in order of 
+    `lx_file_paths`. Otherwise the plan data of all LX files is joined on Site ID, and processed at once.
+
+    Parameters
+    ----------
+    df_sites : pandas.DataFrame
+        Sites of each LX file, and the LX file each site is kept from (see `_merge_lx_sites`)
+
+    Yields
+    ------
+    df_plans : pandas.DataFrame
+        Processed LX data of the merged LX files, in long format (see `_lx_records_to_plans`), with an 
+        additional `lx_file` column (name of the LX file each site is from)
+    plans_xy : numpy.ndarray of float
+        (x, y) coordinates of the site of each row of `df_plans`, NaN for sites without location data
+    """
+    # merged sites, sorted by Site ID, to resolve the link targets
+    # links to a site of another LX file are kept, as the coordinates of both ends are in `site_index`
+    df_kept = df_sites.loc[df_sites['kept']]
+    order = np.argsort(df_kept['site_id'].to_numpy(), kind='stable')
+    merged_ids = df_kept['site_id'].to_numpy(dtype='int64')[order]
+    merged_files = df_kept['lx_file'].to_numpy()[order]
+    n_cross_file = 0
+    n_not_found = 0
+    
+    frames = []
+    frames_xy = []
+    for rank, (lx_file_path, lx_fileName) in enumerate(zip(lx_file_paths, lx_file_names)):
+        print(f'[INFO] Reading LX file {rank + 1} of {len(lx_file_paths)}: {lx_fileName}')
+        for df_plans, plans_xy in _iter_lx_chunks(lx_file_path, 
+                                                  site_index, 
+                                                  break_at_nonNumeric, 
+                                                  search_term_intID, 
+                                                  search_term_subsystem, 
+                                                  search_term_pp, 
+                                                  search_term_subsystemData, 
+                                                  search_limit, 
+                                                  skip_initial_lines, 
+                                                  chunk_size, 
+                                                  error_ints, 
+                                                  error_subsys,
+                                                  sites=df_kept.loc[df_kept['lx_rank'] == rank, 'site_id'],
+                                                  subsystems=subsystems,
+                                                  plans=plans,
+                                                  record_types=record_types):
+            df_plans['lx_file'] = lx_fileName
+            
+            # resolve the link targets against the merged sites
+            to_site = df_plans['slaved'].to_numpy(dtype='int64')
+            is_link = to_site > 0
+            if len(merged_ids) > 0:
+                pos = np.minimum(np.searchsorted(merged_ids, to_site[is_link]), len(merged_ids) - 1)
+                found = merged_ids[pos] == to_site[is_link]
+                n_cross_file += int((found & (merged_files[pos] != lx_fileName)).sum())
+                n_not_found += int((~found).sum())
+            
+            if chunk_size:
+                yield df_plans, plans_xy
+            else:
+                frames.append(df_plans)
+                frames_xy.append(plans_xy)
+    
+    print(f'[INFO] Number of links to a site of another LX file: {n_cross_file}')
+    print(f'[INFO] Number of links to a site not in any LX file: {n_not_found}')
+    if chunk_size:
+        return
+    
+    df_plans = pd.concat(frames, ignore_index=True)
+    plans_xy = np.concatenate(frames_xy)
+    del frames, frames_xy
+    
+    # order the merged rows as for a single LX file: by record type ('PP' then 'LP') and `site_id`
+    # note: the (stable) sort keeps the plan order of each site -> the PP and LP rows stay aligned
+    order = np.lexsort((df_plans['site_id'].to_numpy(), df_plans['record_type'].to_numpy() != 'PP'))
+    df_plans = df_plans.iloc[order].reset_index(drop=True)
+    plans_xy = plans_xy[order]
+    
+    yield df_plans, plans_xy
+
+
+def merge_lx_to_gis(lx_file_paths, 
+                    scats_sites_path, 
+                    col_scats_x='Longitude', 
+                    col_scats_y='Latitude', 
+                    scats_input_crs_id=4326, 
+                    scats_projected_crs_id=8058, 
+                    output_folderPath_LX_processed=None, 
+                    output_gis_folderPath=None,
+                    output_name='merged_LX',
+                    lx_file_names=None,
+                    precedence='first',
+                    break_at_nonNumeric=True,
+                    search_term_intID='INT=',
+                    search_term_subsystem='S#=',
+                    search_term_pp='PP',
+                    search_term_subsystemData='SS=',
+                    search_limit=20,
+                    skip_initial_lines=10,
+                    processed_format='csv',
+                    chunk_size=None,
+                    subsystems=None,
+                    sites=None,
+                    plans=(1, 2, 3, 4),
+                    record_types=RECORD_TYPES,
+                    profile=None):
+    """
+    Reads the SCATS LX files of several regional computers, and exports them as a single network.
+    
+    Merged version of `lx_to_gis`: each LX file is parsed, the plan data of all LX files is joined on 
+    Site ID, and one set of processed tables and plan geopackages is exported for the whole network. 
+    Sites found in more than one LX file are only kept once (see `precedence`), and links to a site 
+    of another LX file (e.g. across regions) are resolved against the shared SCATS site locations.
+    
+    Parameters
+    ----------
+    lx_file_paths : list of str or PosixPath
+        File paths to the SCATS LX files (or bytes / file objects, see `lx_to_memory`), in order of precedence
+    
+    scats_sites_path : str or PosixPath
+        File path to the csv file with the locations of the SCATS sites of all LX files
+        See `lx_to_gis`
+    
+    col_scats_x, col_scats_y, scats_input_crs_id, scats_projected_crs_id : optional
+        See `lx_to_gis`
+    
+    output_folderPath_LX_processed : str or PosixPath, optional
+        Folder path to export the processed LX data to
+        Default value is None, which will not export a file
+    
+    output_gis_folderPath : str or PosixPath, optional
+        Folder path to export the processed LX data as GIS geopackages (.gpkg)
+        Default value is None, which will not export a file
+    
+    output_name : str, optional
+        Name used in place of the LX file name in the exported file names
+        Default value is 'merged_LX', e.g. `LX_processed_merged_LX.csv` and `LX_plan1_merged.gpkg`
+    
+    lx_file_names : list of str, optional
+        Unique name of each LX file (e.g. its regional computer), in order of `lx_file_paths`
+        Used in the `lx_file` column of the outputs, to tell the sites and subsystems of each LX file apart
+        Default value is None, which will use the LX file names (without extension) -> required for 
+        bytes / file objects, or LX files with the same name in different folders
+    
+    precedence : str, optional
+        LX file kept for sites found in more than one LX file:
+        - 'first' : the first LX file in `lx_file_paths`
+        - 'last' : the last LX file in `lx_file_paths` (e.g. for files ordered oldest to newest)
+        Default value is 'first'
+    
+    break_at_nonNumeric, search_term_intID, search_term_subsystem, search_term_pp, 
+    search_term_subsystemData, search_limit, skip_initial_lines : optional
+        See `lx_to_gis`
+    
+    processed_format : str, optional
+        See `lx_to_gis`
+        Default value is 'csv'
+    
+    chunk_size : int, optional
+        Number of sites to process at a time, see `lx_to_gis`
+        Each LX file is processed in turn, keeping only the sites with precedence, so the merged rows are 
+        in order of `lx_file_paths` rather than sorted by Site ID
+        Default value is None, which will process the LX data of all LX files at once
+    
+    subsystems, sites, plans, record_types : optional
+        Selection of the LX data to process, see `lx_to_gis`
+        Note that Subsystem IDs are only unique within each regional computer, so `subsystems` 
+        selects these Subsystem IDs in every LX file
+    
+    profile : bool, optional
+        Profile the run, see `lx_to_gis`
+        Default value is None, which will profile the run if the `SCATSUTILITIES_PROFILE` environment 
+        variable is set
+    
+    Returns
+    -------
+    df : gpd.GeoDataFrame
+        Processed LX data of the merged network (see `lx_to_gis`)
+        None in streaming mode (`chunk_size`)
+    
+    error_ints : ::list:: of str
+        List of Site IDs with invalid data, of all LX files (see `lx_to_gis`)
+        
+    error_subsys : ::list:: of str
+        List of Subsystem IDs with invalid data, of all LX files (see `lx_to_gis`)
+    
+    df_duplicates : pandas.DataFrame
+        Sites found in more than one LX file, with:
+        - site_id, subsystem_id : Site ID and its Subsystem ID in the LX file
+        - lx_file : name of the LX file (see `lx_file_names`)
+        - kept : True for the LX file the site is kept from
+    
+    Notes
+    -----
+    Exports the same files as `lx_to_gis`, named after `output_name`, and 
+    
+    - df_duplicates : CSV file `LX_duplicateSites_*.csv` (or Parquet file, see `processed_format`)
+    
+    The normalised plan data (`LX_plans_*.csv`) and combined layers of all plans (`LX_allPlans_*.gpkg`) 
+    have an additional `lx_file` column with the name of the LX file of each site. As Subsystem IDs 
+    are only unique within each regional computer, the link metric summary (`LX_linkMetrics_*.csv`) 
+    and subsystem corridors are by LX file and subsystem.
+    
+    By default, the LX data of all LX files is processed at once, as one row per site and plan, so is 
+    manageable for a statewide network. Use `chunk_size` to bound the peak memory instead.
+    """
+    if precedence not in MERGE_PRECEDENCE:
+        raise ValueError(f'Unknown precedence: {precedence}')
+    if lx_file_names is None:
+        lx_file_names = [_lx_file_stem(lx_file_path) for lx_file_path in lx_file_paths]
+    # the sites and subsystems of each LX file are told apart by its name
+    if (len(lx_file_names) != len(lx_file_paths)) or (len(set(lx_file_names)) != len(lx_file_names)):
+        raise ValueError(f'LX file names are not unique, set `lx_file_names`: {list(lx_file_names)}')
+    _check_selection(plans, record_types)
+    # profile each stage of the run, if turned on
+    profile_data = _start_profile(profile)
+    
+    ### PART 1 - READ IN DATA
+    # Read SCATS site location data
+    # shared by all LX files -> links between sites of different LX files use the same locations
+    with _profile_stage(profile_data, 'read_sites'):
+        site_index = _read_scats_sites(scats_sites_path, 
+                                       col_scats_x, 
+                                       col_scats_y, 
+                                       scats_input_crs_id, 
+                                       scats_projected_crs_id)
+    
+    ### PART 2 - EXTRACT AND MERGE LX FILE DATA
+    # initialise lists
+    error_ints = [] # stores any intersection PP with errors
+    error_subsys = [] # stores any subsystem LP with errors
+    
+    # resolve the sites found in several LX files, before parsing them
+    # quick search of the `INT=` blocks of each LX file, without the PP data
+    lx_file_paths = [_as_input(lx_file_path) for lx_file_path in lx_file_paths]
+    with _profile_stage(profile_data, 'merge_sites'):
+        df_sites = _merge_lx_sites(lx_file_paths, 
+                                   lx_file_names, 
+                                   precedence, 
+                                   break_at_nonNumeric, 
+                                   search_term_intID, 
+                                   search_term_subsystem, 
+                                   search_term_pp, 
+                                   search_limit, 
+                                   sites=sites, 
+                                   subsystems=subsystems)
+    
+    # sites in more than one LX file, for review
+    df_duplicates = (df_sites
+                     .drop_duplicates(subset=['site_id', 'lx_file'])
+                     .loc[lambda df: df['site_id'].duplicated(keep=False), ['site_id', 'subsystem_id', 'lx_file', 'kept']]
+                     .sort_values(by=['site_id', 'kept'], ascending=[True, False])
+                     .reset_index(drop=True))
+    print(f'[INFO] Number of sites in more than one LX file: {df_duplicates["site_id"].nunique()}')
+    
+    subsystem_sites = None
+    if chunk_size:
+        # number of sites of each subsystem of each LX file -> the subsystems are exported as soon as 
+        # all their sites are processed (see `_export_lx_chunks`)
+        subsystem_sites = df_sites.loc[df_sites['kept']].groupby(SUBSYSTEM_KEYS).size()
+    
+    lx_chunks = _iter_merged_lx_chunks(lx_file_paths, 
+                                       lx_file_names, 
+                                       site_index, 
+                                       df_sites, 
+                                       break_at_nonNumeric, 
+                                       search_term_intID, 
+                                       search_term_subsystem, 
+                                       search_term_pp, 
+                                       search_term_subsystemData, 
+                                       search_limit, 
+                                       skip_initial_lines, 
+                                       chunk_size, 
+                                       error_ints, 
+                                       error_subsys, 
+                                       subsystems=subsystems,
+                                       plans=plans,
+                                       record_types=record_types)
+    
+    # process and export the merged network
+    df_output = _export_lx_chunks(lx_chunks, 
+                                  site_index, 
+                                  output_name, 
+                                  output_folderPath_LX_processed, 
+                                  output_gis_folderPath, 
+                                  chunk_size, 
+                                  processed_format, 
+                                  plans=plans, 
+                                  record_types=record_types,
+                                  subsystem_sites=subsystem_sites,
+                                  profile_data=profile_data)
+    
+    if output_folderPath_LX_processed:
+        # export file
+        _write_table(df_duplicates, 
+                     Path(output_folderPath_LX_processed, f'LX_duplicateSites_{output_name}'), 
+                     processed_format).close()
+    
+    # export the profiling data
+    _write_profile(profile_data, output_gis_folderPath or output_folderPath_LX_processed or Path.cwd(), output_name)
+    
+    return df_output, error_ints, error_subsys, df_duplicates
+
+
+### LX FILE INDEX (RANDOM ACCESS)
+
+# records of the LX file index (see `build_lx_index`), sorted by `record_id`
+LX_INDEX_DTYPE = np.dtype([('record_id', 'int64'), 
+                           ('subsystem_id', 'int64'), 
+                           ('offset', 'int64'), 
+                           ('length', 'int64')])
+
+
+def _lx_index_path(lx_file_path, index_path=None):
+    """
+    Helper function to get the file path of the LX file index
+    Defaults to the LX file path with a `.idx.npz` extension added, next to the LX file
+    """
+    if index_path:
+        return Path(index_path)
+    return Path(f'{lx_file_path}.idx.npz')
+
+
+def _lx_index_meta(lx_file_path, search_limit, skip_initial_lines):
+    """
+    Helper function to describe the LX file (size and modification time) and the search settings the 
+    LX file index is built for -> the index is rebuilt if any of these change
+    """
+    stat = os.stat(lx_file_path)
+    return np.array([stat.st_size, stat.st_mtime_ns, search_limit, skip_initial_lines], dtype='int64')
+
+
+def _to_index_records(records):
+    """
+    Helper function to convert the [record_id, subsystem_id, offset, length] records of the LX file index 
+    into an array sorted by `record_id` (keeping the first record of any duplicated ID, as in the LX file)
+    """
+    records = np.array([tuple(record) for record in records], dtype=LX_INDEX_DTYPE)
+    _, first_index = np.unique(records['record_id'], return_index=True)
+    return records[first_index]
+
+
+def build_lx_index(lx_file_path, 
+                   index_path=None,
+                   search_term_intID='INT=',
+                   search_term_subsystem='S#=',
+                   search_term_subsystemData='SS=',
+                   search_limit=20,
+                   skip_initial_lines=10):
+    """
+    Builds a sidecar index of the SCATS LX file, for random access to single sites and subsystems.
+    
+    The LX file is scanned once (without processing the PP or LP data), to record the byte offset and 
+    length of every `INT=` and `SS=` block, and the Subsystem ID of each site. `read_site` and 
+    `read_subsystem` then read and process only the blocks required, without scanning the LX file again.
+    
+    Parameters
+    ----------
+    lx_file_path : str or PosixPath
+        File path to the SCATS LX file
+    
+    index_path : str or PosixPath, optional
+        File path to save the index to
+        Default value is None, which will save the index next to the LX file (`<lx_file_path>.idx.npz`)
+    
+    search_term_intID, search_term_subsystem, search_term_subsystemData, search_limit, skip_initial_lines : optional
+        See `lx_to_gis`
+        Each block covers the same lines as searched by `lx_to_gis` (`search_limit` lines after the Site ID 
+        or Subsystem ID)
+    
+    Returns
+    -------
+    index_path : PosixPath
+        File path of the saved index
+    """
+    index_path = _lx_index_path(lx_file_path, index_path)
+    window_size = search_limit + 2
+    term_intID = search_term_intID.encode()
+    term_subsystem = search_term_subsystem.encode()
+    term_subsystemData = search_term_subsystemData.encode()
+    
+    sites = [] # [site_id, subsystem_id, offset, length] of each INT= block
+    subsystems = [] # [subsystem_id, -1, offset, length] of each SS= block
+    pending = deque() # (line number, record) of the blocks still within their search window
+    
+    offset = 0
+    with open(lx_file_path, 'rb') as f:
+        for count, line in enumerate(f):
+            # the search window of the earliest blocks ends before this line
+            while pending and (count - pending[0][0] >= window_size):
+                _, record = pending.popleft()
+                record[3] = offset - record[2]
+            
+            # search for lines with intersection ID number
+            if term_intID in line:
+                try:
+                    site_id = int(line.strip().split(b'!')[1].split(b'=')[1].strip())
+                    sites.append([site_id, None, offset, None])
+                    pending.append((count, sites[-1]))
+                except (IndexError, ValueError):
+                    # invalid Site ID -> not indexed
+                    pass
+            
+            # search for lines with subsystem ID number (second section search)
+            if (term_subsystemData in line) and (count > skip_initial_lines):
+                try:
+                    subsystem_id = int(line.strip().split(b'!')[0].split(b'=')[1].strip())
+                    subsystems.append([subsystem_id, -1, offset, None])
+                    pending.append((count, subsystems[-1]))
+                except (IndexError, ValueError):
+                    # invalid Subsystem ID -> not indexed
+                    pass
+            
+            # search for lines with subsystem ID number, within a few rows of the intersection ID number
+            if term_subsystem in line:
+                try:
+                    subsystem_id = int(line.strip().split(b'!')[0].split(b'=')[1].strip())
+                    for _, record in pending:
+                        if record[1] is None:
+                            record[1] = subsystem_id
+                except (IndexError, ValueError):
+                    # invalid Subsystem ID -> allow search to continue, in case valid subsystem available
+                    pass
+            
+            offset += len(line)
+    
+    # the search window of the last blocks ends at the end of the LX file
+    for _, record in pending:
+        record[3] = offset - record[2]
+    for record in sites:
+        if record[1] is None:
+            # subsystem not found
+            record[1] = -1
+    
+    with open(index_path, 'wb') as f:
+        np.savez(f, 
+                 sites=_to_index_records(sites), 
+                 subsystems=_to_index_records(subsystems), 
+                 meta=_lx_index_meta(lx_file_path, search_limit, skip_initial_lines),
+                 search_terms=np.array([search_term_intID, search_term_subsystem, search_term_subsystemData]))
+    print(f'[INFO] Indexed {len(sites)} sites and {len(subsystems)} subsystems of LX file: {index_path}')
+    
+    return index_path
+
+
+def _load_lx_index(lx_file_path, 
+                   index_path, 
+                   search_term_intID, 
+                   search_term_subsystem, 
+                   search_term_subsystemData, 
+                   search_limit, 
+                   skip_initial_lines):
+    """
+    Helper function to load the LX file index, (re)building it if missing or out of date
+    See `build_lx_index` for the parameters
+
+    Returns
+    -------
+    sites, subsystems : numpy.ndarray
+        Index records of the `INT=` and `SS=` blocks (see `LX_INDEX_DTYPE`)
+    """
+    index_path = _lx_index_path(lx_file_path, index_path)
+    search_terms = [search_term_intID, search_term_subsystem, search_term_subsystemData]
+    
+    if index_path.exists():
+        with np.load(index_path) as index:
+            if (np.array_equal(index['meta'], _lx_index_meta(lx_file_path, search_limit, skip_initial_lines)) 
+                    and (index['search_terms'].tolist() == search_terms)):
+                return index['sites'], index['subsystems']
+        print(f'[INFO] LX file index out of date: {index_path}')
+    
+    build_lx_index(lx_file_path, index_path, *search_terms, search_limit, skip_initial_lines)
+    with np.load(index_path) as index:
+        return index['sites'], index['subsystems']
+
+
+def _find_index_record(records, record_id):
+    """
+    Helper function to find the index record of a Site ID or Subsystem ID (None if not indexed)
+    """
+    pos = np.searchsorted(records['record_id'], int(record_id))
+    if (pos < len(records)) and (records['record_id'][pos] == int(record_id)):
+        return records[pos]
+    return None
+
+
+def _read_lx_block(lx_file_path, record):
+    """
+    Helper function to read a single block of the LX file from its index record
+
+    Returns
+    -------
+    window : list of str
+        Lines of the block, starting at the line with the `INT=` or `SS=` search term
+    """
+    with open(lx_file_path, 'rb') as f:
+        f.seek(int(record['offset']))
+        block = f.read(int(record['length']))
+    # decoded as in `_open_lx`
+    return io.TextIOWrapper(io.BytesIO(block)).readlines()
+
+
+def _read_lx_blocks(lx_file_path, 
+                    site_records, 
+                    subsystem_record, 
+                    break_at_nonNumeric, 
+                    search_term_subsystem, 
+                    search_term_pp, 
+                    plans=(1, 2, 3, 4)):
+    """
+    Helper function to read and process the `INT=` blocks of some sites, and the `SS=` block of their subsystem
+    See `read_subsystem` for the parameters
+
+    Parameters
+    ----------
+    site_records : sequence of numpy.void
+        Index records of the `INT=` blocks (see `LX_INDEX_DTYPE`)
+    subsystem_record : numpy.void
+        Index record of the `SS=` block, None if the subsystem is not indexed
+
+    Returns
+    -------
+    df_plans : pandas.DataFrame
+        Processed LX data in long format (see `_lx_records_to_plans`)
+    """
+    error_ints = [] # stores any intersection PP with errors
+    error_subsys = [] # stores any subsystem LP with errors
+    
+    # LP data of the subsystem
+    lx_subsys_data = []
+    if subsystem_record is not None:
+        lx_subsys_data.append(_parse_subsys_block(_read_lx_block(lx_file_path, subsystem_record), 
+                                                  break_at_nonNumeric, 
+                                                  error_subsys, 
+                                                  plans=plans))
+    df_subsys = pd.DataFrame(lx_subsys_data, columns=COLUMNS_SUBSYS_DATA)
+    
+    # PP data of the sites (in LX file order)
+    lx_int_data = []
+    for record in sorted(site_records, key=lambda record: record['offset']):
+        site_data = _parse_int_block(_read_lx_block(lx_file_path, record), 
+                                     break_at_nonNumeric, 
+                                     search_term_subsystem, 
+                                     search_term_pp, 
+                                     error_ints,
+                                     plans=plans)
+        if len(site_data) > 0:
+            lx_int_data.append(site_data)
+    
+    return _lx_records_to_plans(lx_int_data, df_subsys, plans)
+
+
+def read_subsystem(lx_file_path, 
+                   subsystem_id, 
+                   index_path=None,
+                   break_at_nonNumeric=True,
+                   search_term_intID='INT=',
+                   search_term_subsystem='S#=',
+                   search_term_pp='PP',
+                   search_term_subsystemData='SS=',
+                   search_limit=20,
+                   skip_initial_lines=10,
+                   plans=(1, 2, 3, 4),
+                   site_ids=None):
+    """
+    Reads the PP and LP data of a single subsystem of a SCATS LX file, using the LX file index.
+    
+    Only the `SS=` block of the subsystem and the `INT=` blocks of its sites are read and processed: 
+    the LX file is not scanned (see `build_lx_index`). The index is built on first use, 
+    and rebuilt if the LX file changes.
+    
+    Parameters
+    ----------
+    lx_file_path : str or PosixPath
+        File path to the SCATS LX file
+    
+    subsystem_id : int
+        Subsystem ID to read
+    
+    index_path : str or PosixPath, optional
+        File path of the LX file index (see `build_lx_index`)
+        Default value is None, which will use the index next to the LX file (`<lx_file_path>.idx.npz`)
+    
+    break_at_nonNumeric, search_term_intID, search_term_subsystem, search_term_pp, 
+    search_term_subsystemData, search_limit, skip_initial_lines : optional
+        See `lx_to_gis`
+    
+    plans : tuple of int, optional
+        Plan IDs (1..4) to read
+        Default value is (1, 2, 3, 4)
+    
+    site_ids : list of int, optional
+        Site IDs of the subsystem to read
+        Default value is None, which will read all the sites of the subsystem
+    
+    Returns
+    -------
+    df_plans : pandas.DataFrame
+        Processed LX data of the sites of the subsystem, in long format (one row per site, plan and 
+        record type, see `COLUMNS_PLAN_DATA`)
+    """
+    _check_selection(plans)
+    sites, subsystems = _load_lx_index(lx_file_path, 
+                                       index_path, 
+                                       search_term_intID, 
+                                       search_term_subsystem, 
+                                       search_term_subsystemData, 
+                                       search_limit, 
+                                       skip_initial_lines)
+    if site_ids is None:
+        site_records = sites[sites['subsystem_id'] == int(subsystem_id)]
+    else:
+        site_records = [record for record in (_find_index_record(sites, site_id) for site_id in site_ids) 
+                        if record is not None]
+    subsystem_record = _find_index_record(subsystems, subsystem_id)
+    if (subsystem_record is None) and (len(site_records) == 0):
+        raise ValueError(f'Subsystem ID not found in LX file: {subsystem_id}')
+    
+    return _read_lx_blocks(lx_file_path, 
+                           site_records, 
+                           subsystem_record, 
+                           break_at_nonNumeric, 
+                           search_term_subsystem, 
+                           search_term_pp, 
+                           plans)
+
+
+def read_site(lx_file_path, 
+              site_id, 
+              index_path=None,
+              break_at_nonNumeric=True,
+              search_term_intID='INT=',
+              search_term_subsystem='S#=',
+              search_term_pp='PP',
+              search_term_subsystemData='SS=',
+              search_limit=20,
+              skip_initial_lines=10,
+              plans=(1, 2, 3, 4)):
     """
-    Reads SCATS LX file and exports Phase Plan and Link Plan data as table and geopackages.
+    Reads the PP and LP data of a single site of a SCATS LX file, using the LX file index.
     
-    Used to process SCATS LX files, extract the Phase Plan (PP) and Link Plan (LP) data. This data is
-    processed and converted into a dataframe table, and also exported as a multi-layer geopackage. 
+    Only the `INT=` block of the site and the `SS=` block of its subsystem are read and processed: 
+    the LX file is not scanned (see `build_lx_index`). The index is built on first use, 
+    and rebuilt if the LX file changes.
     
     Parameters
     ----------
     lx_file_path : str or PosixPath
         File path to the SCATS LX file
-        
+    
+    site_id : int
+        Site ID to read
+    
+    index_path, break_at_nonNumeric, search_term_intID, search_term_subsystem, search_term_pp, 
+    search_term_subsystemData, search_limit, skip_initial_lines, plans : optional
+        See `read_subsystem`
+    
+    Returns
+    -------
+    df_plans : pandas.DataFrame
+        Processed LX data of the site, in long format (one row per plan and record type, 
+        see `COLUMNS_PLAN_DATA`)
+    """
+    _check_selection(plans)
+    sites, subsystems = _load_lx_index(lx_file_path, 
+                                       index_path, 
+                                       search_term_intID, 
+                                       search_term_subsystem, 
+                                       search_term_subsystemData, 
+                                       search_limit, 
+                                       skip_initial_lines)
+    record = _find_index_record(sites, site_id)
+    if record is None:
+        raise ValueError(f'Site ID not found in LX file: {site_id}')
+    
+    return _read_lx_blocks(lx_file_path, 
+                           [record], 
+                           _find_index_record(subsystems, record['subsystem_id']), 
+                           break_at_nonNumeric, 
+                           search_term_subsystem, 
+                           search_term_pp, 
+                           plans)
+
+
+### SCATS DETECTOR VOLUME DATA
+
+# 15-minute volume columns of the SCATS detector volume data
+# V00 = 00:00-00:15, V01 = 00:15-00:30, ... V95 = 23:45-24:00
+VOLUME_COLUMNS = [f'V{interval:02d}' for interval in range(96)]
+
+
+def _iter_volume_chunks(volume_file_paths, col_site, col_detector, col_date, chunk_size, sites=None):
+    """
+    Helper generator reading the SCATS detector volume data, `chunk_size` rows at a time, as compact 
+    typed columns (only the columns required are read)
+    See `volumes_to_gis` for the parameters
+
+    Yields
+    ------
+    chunk : pandas.DataFrame
+        Detector volume data of the chunk, with:
+        - site_id (int32), detector (int16), date (category)
+        - V00 ... V95 (int32) : 15-minute volumes, negative values for no data
+    """
+    if isinstance(volume_file_paths, (str, bytes, os.PathLike)) or hasattr(volume_file_paths, 'read'):
+        volume_file_paths = [volume_file_paths]
+    sites = _as_selection(sites)
+    
+    dtypes = {col_site: 'int32', col_detector: 'int16', col_date: 'category'}
+    dtypes.update({column: 'int32' for column in VOLUME_COLUMNS})
+    
+    for volume_file_path in volume_file_paths:
+        with pd.read_csv(_as_input(volume_file_path), 
+                         usecols=list(dtypes), 
+                         dtype=dtypes, 
+                         chunksize=chunk_size) as reader:
+            for chunk in reader:
+                chunk = chunk.rename(columns={col_site: 'site_id', col_detector: 'detector', col_date: 'date'})
+                if sites is not None:
+                    chunk = chunk.loc[chunk['site_id'].isin(sites)]
+                yield chunk
+
+
+def _aggregate_volume_chunk(chunk):
+    """
+    Helper function to total the 15-minute volumes of a chunk of detector volume data by site
+    The totals can be added together across chunks (see `volumes_to_gis`)
+
+    Parameters
+    ----------
+    chunk : pandas.DataFrame
+        Detector volume data (see `_iter_volume_chunks`)
+
+    Returns
+    -------
+    volume : pandas.DataFrame
+        Total volume of each site (index) and interval (columns 0..95), all detectors and days
+    n_records : pandas.DataFrame
+        Number of detector records with data of each site (index) and interval (columns 0..95)
+    site_dates : pandas.DataFrame
+        Unique (site_id, date) pairs of the chunk
+    """
+    values = chunk[VOLUME_COLUMNS].to_numpy()
+    has_data = values >= 0
+    # no data -> 0 volume (in place, to avoid another copy of the chunk)
+    np.maximum(values, 0, out=values)
+    site_id = chunk['site_id'].to_numpy()
+    
+    volume = pd.DataFrame(values, copy=False).groupby(site_id).sum()
+    n_records = pd.DataFrame(has_data, copy=False).groupby(site_id).sum()
+    site_dates = chunk[['site_id', 'date']].drop_duplicates()
+    site_dates['date'] = site_dates['date'].astype('str')
+    
+    return volume, n_records, site_dates
+
+
+def volumes_to_gis(volume_file_paths, 
+                   scats_sites_path, 
+                   col_scats_x='Longitude', 
+                   col_scats_y='Latitude', 
+                   scats_input_crs_id=4326, 
+                   scats_projected_crs_id=8058, 
+                   output_folderPath_volumes_processed=None, 
+                   output_gis_folderPath=None,
+                   lx_file_path=None,
+                   break_at_nonNumeric=False,
+                   search_term_intID='INT=',
+                   search_term_subsystem='S#=',
+                   search_term_pp='PP',
+                   search_term_subsystemData='SS=',
+                   search_limit=20,
+                   skip_initial_lines=10,
+                   col_site='NB_SCATS_SITE',
+                   col_detector='NB_DETECTOR',
+                   col_date='QT_INTERVAL_COUNT',
+                   chunk_size=100000,
+                   processed_format='csv',
+                   sites=None):
+    """
+    Reads SCATS detector volume data and exports the volume of each site as table and geopackage.
+    
+    Used to process SCATS detector volume exports (one row per site, detector and day, with the volume 
+    of each 15-minute interval). The data is streamed `chunk_size` rows at a time, and totalled by site 
+    and interval as it is read, so the size of the exports (millions of rows) does not need to fit in memory. 
+    The site volumes are joined to the SCATS site locations, and optionally to the Phase Plan (PP) and 
+    Link Plan (LP) data of an LX file, so volumes can be mapped alongside the linkages. 
+    
+    Parameters
+    ----------
+    volume_file_paths : str, PosixPath, bytes or file object, or list of these
+        SCATS detector volume data csv file(s), with the columns:
+        - `col_site`, `col_detector`, `col_date` : Site ID, detector number and date of each record
+        - V00 ... V95 : volume of each 15-minute interval of the day (negative values for no data)
+        Example for Victoria, Australia (SCATS traffic volume data) is available from:
+        https://discover.data.vic.gov.au/dataset/traffic-signal-volume-data
+    
     scats_sites_path : str or PosixPath
-        File path to the csv file identifying the SCATS Site ID number, and the associated
-        latitude and longitude coordinates of each site. 
-        Example for New South Wales, Australia is available from:
-        https://opendata.transport.nsw.gov.au/dataset/traffic-lights-location
-        (as at 8 January 2021)
+        See `lx_to_gis`
     
-    col_scats_x : str, optional
-        Name of column in `scats_sites_path` with the x-coordinate data for each 
-        SCATS site (by Site ID)
-        Default value is 'Longitude'
-        
-    col_scats_y : str, optional
-        Name of column in `scats_sites_path` with the y-coordinate data for each 
-        SCATS site (by Site ID)
-        Default value is 'Latitude'
+    col_scats_x, col_scats_y, scats_input_crs_id, scats_projected_crs_id : optional
+        See `lx_to_gis`
     
-    scats_input_crs_id : int, optional
-        Coordinate system of the x,y coordinates from `scats_sites_path`, as EPSG id number
-        Default value is 4326, which refers to EPSG:4326 and the WGS 84 projection system
-        (i.e. conventional lat/long coordinates)
-        
-    scats_projected_crs_id : int, optional
-        Coordinate system to transfer the `scats_sites_path` coordinate data into, as EPSG id number
-        It is STRONGLY RECOMMENDED to use a project coordinate system (e.g. GDA2020 MGA Zone xx, or GDA2020 Lambert)
-        Default value is 8058, which refers to EPSG:8058 and the GDA2020 NSW Lambert projection system
-        This is a projected coordinate system
-        
-    output_folderPath_LX_processed : str or PosixPath, optional
-        Folder path to export the processed LX data to
+    output_folderPath_volumes_processed : str or PosixPath, optional
+        Folder path to export the volume of each site and interval to
         Default value is None, which will not export a file
     
     output_gis_folderPath : str or PosixPath, optional
-        Folder path to export the process LX data as GIS geopackages (.gpkg)
+        Folder path to export the volume of each site as GIS geopackage (.gpkg)
         Default value is None, which will not export a file
-
-    break_at_nonNumeric : bool, optional
-        Tag to decide if the code should break at each invalid Site ID or Subsystem ID to allow user
-        to review and investigate LX file.
-        If set to False, the code will record a '-2' code in the `connected_site` output data 
-        Default value is True, which will cause the code to break everytime it encounters an 
-        invalid Site ID or Subsystem ID.
     
-    search_term_intID : str, optional
-        For debugging only
-        Search term to identify lines with the Site ID number (as string)
-        Default value is 'INT=', which is the search term
-        
-    search_term_subsystem : str, optional
-        For debugging only
-        Search term to identify lines with the Subsystem ID number applicable to the Site ID
-        Default value is 'S#=', which is the search term
-        
-    search_term_pp : str, optional
-        For debugging only
-        Search term to identify lines with the Phase Plan (PP) (as string)
-        Default value is 'PP', which is the search term
-        
-    search_term_subsystemData : str, optional
-        For debugging only
-        Search term to identify lines with the Subsystem ID number 
-        (as string) containing the Link Plan (LP) data
-        Default value is 'SS=', which is the search term
-        
-    search_limit : int, optional
-        For debugging only
-        Maximum number of lines to search in LX file for PP and LP data 
-        (after finding the Site ID or Subsystem ID)
-        Default value is 20, which will search through a maximum of 20 lines
-        
-    skip_initial_lines : int, optional
-        For debugging only
-        Used in `search_term_subsystemData` search to skip over the metadata in initial rows
-        Default value is 10, which will skip the initial 10 lines of the LX file
+    lx_file_path : str or PosixPath, optional
+        SCATS LX file to join the site volumes to (see `lx_to_gis`)
+        Default value is None, which will not join the volumes to the LX data
+    
+    break_at_nonNumeric, search_term_intID, search_term_subsystem, search_term_pp, 
+    search_term_subsystemData, search_limit, skip_initial_lines : optional
+        Options to parse `lx_file_path` with, see `lx_to_gis`
+        Note the default value of `break_at_nonNumeric` is False, which will record a '-2' code for 
+        invalid linked sites rather than break the volume processing
+    
+    col_site : str, optional
+        Name of column in `volume_file_paths` with the Site ID
+        Default value is 'NB_SCATS_SITE'
+    
+    col_detector : str, optional
+        Name of column in `volume_file_paths` with the detector number
+        Default value is 'NB_DETECTOR'
+    
+    col_date : str, optional
+        Name of column in `volume_file_paths` with the date of each record
+        Default value is 'QT_INTERVAL_COUNT'
+    
+    chunk_size : int, optional
+        Number of rows of `volume_file_paths` to process at a time
+        Default value is 100000
+    
+    processed_format : str, optional
+        File format of the volume data exported to `output_folderPath_volumes_processed`
+        Either 'csv' or 'parquet' (requires the optional `pyarrow` package)
+        Default value is 'csv'
+    
+    sites : list of int, optional
+        Site IDs to process
+        Default value is None, which will process all sites
     
     Returns
     -------
-    df : pandas.DataFrame
-        Dataframe of processed LX data, with:
-        - INT_ID, SUBSYSTEM_ID, PP1, PP2, PP3, PP4
-        - SUBSYSTEM_ID, LP1, LP2, LP3, LP4
+    df_volumes : pandas.DataFrame
+        Volume of each site and 15-minute interval, with:
+        - site_id, interval (0..95, see `VOLUME_COLUMNS`)
+        - volume : total volume of all detectors and days
+        - n_records : number of detector records with data
+        - n_days : number of days with data for the site
+        - mean_volume : mean daily volume of the site (all detectors), `volume` / `n_days`
+    
+    gdf_sites : gpd.GeoDataFrame
+        Daily volume of each site, with:
+        - site_id, n_days
+        - volume_24hour : mean daily volume (all detectors)
+        - peak_interval, peak_volume : 15-minute interval with the highest mean volume, and its mean volume
+        - geometry : site location (None for sites without location data)
     
-    error_ints : ::list:: of str
-        List of Site IDs with invalid data
-        Format of ['Site ID', 'Error message']
-        
-    error_subsys : ::list:: of str
-        List of Subsystem IDs with invalid data
-        Format of ['Site ID', 'Error message']
-        
     Notes
     -----
     Exports the following files
     
-    - df : CSV file
-    - GIS compatible geopackage (gpkg) files for
-        - PP1
-        - PP2
-        - PP3
-        - PP4
-        - LP1
-        - LP2
-        - LP3
-        - LP4
-        - SL1
-        - SL2
-        - SL3
-        - SL4
-    
-    Note that the `SLx` series is not always outputted, as sites are rarely slaved (i.e. hard-fixed) to an
-    adjacent site.
-    
-    QGIS styles are available from the Github repository:
-    https://github.com/johntrieu91/scatsutilities
-    
+    - df_volumes : CSV file (or Parquet file, see `processed_format`)
+    - GIS compatible geopackage (gpkg) file, with the layers:
+        - volume_sites : gdf_sites (sites with location data only)
+        - volume_plan_sites : PP and LP data of each site and plan (see `allPlans_sites` in `lx_to_gis`), 
+          joined with the daily volume of each site (if `lx_file_path` is set)
+        - volume_plan_links : LP and SL links of each site and plan (see `allPlans_links` in `lx_to_gis`), 
+          joined with the daily volume of the sites at both ends of each link (if `lx_file_path` is set)
+    - sites without location data : CSV file
     """
     ### PART 1 - READ IN DATA
-    # Read LX file
-    # NOTE: this has been changed to a context manager, 
-    # with file read only where required later in the code
-
+    if isinstance(volume_file_paths, (list, tuple)):
+        volume_fileName = 'combined'
+    elif isinstance(volume_file_paths, bytes):
+        volume_fileName = 'volumes'
+    else:
+        volume_fileName = _lx_file_stem(volume_file_paths)
     
     # Read SCATS site location data
-    df_scatsLoc = pd.read_csv(Path(scats_sites_path))
-    # convert to gpd.GeoDataFrame
-    gdf_scatsLoc = gpd.GeoDataFrame(df_scatsLoc, 
-                                    geometry=gpd.points_from_xy(df_scatsLoc[col_scats_x], df_scatsLoc[col_scats_y]))
-    # set CRS
-    gdf_scatsLoc = gdf_scatsLoc.set_crs(epsg=scats_input_crs_id)
-    # re-project to NSW Lambert (project coordinate system)
-    if scats_projected_crs_id:
-        gdf_scatsLoc = gdf_scatsLoc.to_crs(epsg=scats_projected_crs_id)
-    
-    ### PART 2 - EXTRACT LX FILE DATA
-    # initialise lists
-    lx_int_data = [] # stores the final PP data
-    lx_subsys_data = [] # stores the final LP data
-    error_ints = [] # stores any intersection PP with errors
-    error_subsys = [] # stores any subsystem LP with errors
+    site_index = _read_scats_sites(scats_sites_path, 
+                                   col_scats_x, 
+                                   col_scats_y, 
+                                   scats_input_crs_id, 
+                                   scats_projected_crs_id)
     
+    ### PART 2 - TOTAL THE VOLUMES BY SITE AND INTERVAL
+    # only the totals are kept in memory (one row per site), not the volume data
+    volume = pd.DataFrame(dtype='int64')
+    n_records = pd.DataFrame(dtype='int64')
+    site_days = defaultdict(set) # dates with data of each site
+    n_rows = 0
+    for chunk in _iter_volume_chunks(volume_file_paths, col_site, col_detector, col_date, chunk_size, sites):
+        n_rows += chunk.shape[0]
+        chunk_volume, chunk_n_records, chunk_site_dates = _aggregate_volume_chunk(chunk)
+        volume = volume.add(chunk_volume, fill_value=0)
+        n_records = n_records.add(chunk_n_records, fill_value=0)
+        for site_id, date in zip(chunk_site_dates['site_id'].tolist(), chunk_site_dates['date'].tolist()):
+            site_days[site_id].add(date)
+        print(f'[INFO] Processed {n_rows} detector records')
     
-    ### PART 2A - INTERSECTION PHASE PLAN DATA
-    # iterate through LX file to extract PP data
-    with open(Path(lx_file_path), 'r') as f:
-        lines = f.readlines()
-        
-        for count, line in enumerate(lines):
-            site_data = [] # temp storage of data
-            # search for lines with intersection ID number
-            if search_term_intID in line:
-                line_items = line.strip().split('!')
-                # take index=1 with `INT=`
-                site_id = line_items[1]
-                # split on `=` and take index=1 with the TCS ID
-                site_id = site_id.split('=')
-                site_id = site_id[1].strip()
-
-                try:
-                    int(site_id)
-                    site_data.append(site_id)
-                except ValueError as e:
-                    if break_at_nonNumeric:
-                        print(f'[ERROR] Non-numeric Site ID identified: {site_id}, ValueError: {e}')
-                        # add to error list with message
-                        error_ints.append([site_id, 'Non-numeric Site ID'])
-                        raise ValueError
-                    else:
-                        print(f'[WARNING] Non-numeric Site ID identified: {site_id}, ValueError: {e}')
-                        # add to error list with message
-                        error_ints.append([site_id, 'Non-numeric Site ID'])
-                        # return to start of loop because site ID is invalid
-                        continue
-
-                # search for lines with subsystem ID number, within a few rows of the intersection ID number
-                line_n_search = count
-                stop_loop = 0
-                while not stop_loop:
-                    if search_term_subsystem in lines[line_n_search]:
-                        subsystem_line_items = lines[line_n_search].strip().split('!')
-                        # take index=0 with `S#=`
-                        subsystem_id = subsystem_line_items[0]
-                        # split on `=` and take index=1 with the Subsystem ID
-                        subsystem_id = subsystem_id.split('=')
-                        subsystem_id = subsystem_id[1].strip()
-                        
-                        try:
-                            int(subsystem_id)
-                            site_data.append(subsystem_id)
-                            # found what we were looking for -> set breaking condition for loop
-                            stop_loop = 1
-                        except ValueError as e:
-                            if break_at_nonNumeric:
-                                print(f'[ERROR] Non-numeric Subsystem ID: {subsystem_id}, ValueError: {e}')
-                                # add to error list with message
-                                error_ints.append([site_id, f'Non-numeric Subsystem ID {subsystem_id} for Site ID'])
-                                raise ValueError
-                            else:
-                                print(f'[WARNING] Non-numeric Subsystem ID: {subsystem_id}, ValueError: {e}')
-                                # add to error list with message
-                                error_ints.append([site_id, f'Non-numeric Subsystem ID {subsystem_id} for Site ID'])
-                                # allow search to continue, in case valid subsystem available
-
-                    # prevent infinite loop
-                    # didn't find what we were looking for -> set breaking condition for loop
-                    if line_n_search > (count + search_limit):
-                        stop_loop = 1
-                        # add to error list with message
-                        error_ints.append([site_id, 'Subsystem not found'])
-
-                    # increment line number
-                    line_n_search += 1
-
-                # search for lines with Phase Plan (PP) data, within a few rows of the intersection ID number
-                # this defines the local offset point for the intersection
-                # PP1 -> PP4
-                # reminder: range(1,5,2) means [1, 3]
-                # reminder: SCATS LX PP data comes over 2 lines, such as:
-                # PP1=0,0F!PP2=0,0F!
-                # PP3=0,0F!PP4=0,0F!
-                # therefore, can extract two PP at a time
-                for pp_id in range(1,5,2):
-                    line_n_search = count
-                    stop_loop = 0
-                    search_term_pp = f'PP{pp_id}='
-                    print(f'[INFO] Processing Site {site_id}, PP{pp_id}')
-
-                    while not stop_loop:
-                        if search_term_pp in lines[line_n_search]:
-                            pp_line_items = lines[line_n_search].strip().split('!')
-
-                            # get first PP (PP1 or PP3)
-                            pp_item = pp_line_items[0]
-                            # split on `=` and take index=1 with the PP data
-                            pp_item = pp_item.split('=')
-                            pp_item = pp_item[1].strip()
-                            # append PP1 data
-                            site_data.append(pp_item)
-                            # extract PP1 metadata
-                            pp_data = pp_breakdown(pp_item, break_at_nonNumeric)
-                            for pp_data_item in pp_data:
-                                site_data.append(pp_data_item)
-
-                            # get second PP (PP2 or PP4)
-                            pp_item = pp_line_items[1]
-                            # split on `=` and take index=1 with the PP data
-                            pp_item = pp_item.split('=')
-                            pp_item = pp_item[1].strip()
-                            # append PP2 data
-                            site_data.append(pp_item)
-                            # extract PP2 metadata
-                            pp_data = pp_breakdown(pp_item, break_at_nonNumeric)
-                            for pp_data_item in pp_data:
-                                site_data.append(pp_data_item)
-
-                            # found what we were looking for -> set breaking condition for loop
-                            stop_loop = 1
-
-                        # prevent infinite loop
-                        # didn't find what we were looking for -> set breaking condition for loop
-                        if line_n_search > (count + search_limit):
-                            stop_loop = 1
-                            # add to error list with message
-                            error_ints.append([site_id, 'Subsystem not found'])
-
-                        # increment line number
-                        line_n_search += 1
-
-            # if we have all the data we need, append to the main list
-            ### UPDATE to be desired number of parameters when all done
-            if len(site_data) > 0:
-                lx_int_data.append(site_data)
-
-        print(f'[INFO] Number of PP plan items identified: {len(lx_int_data)}')
-    
-        ### PART 2B - SUBSYSTEM LINK PLAN DATA
-        # iterate through LX file to extract LP data
-        for count, line in enumerate(lines):
-            subsys_data = [] # temp storage of data
-            # search for lines with subsystem ID number (second section search)
-            if (search_term_subsystemData in line) and (count > skip_initial_lines):
-                line_items = line.strip().split('!')
-                # take index=0 with `SS=`
-                subsys_id = line_items[0].strip()
-                # split on `=` and take index=1 with the Subsystem ID
-                subsys_id = subsys_id.split('=')
-                subsys_id = subsys_id[1].strip()
-
-                subsys_data.append(subsys_id)
-
-
-                # search for lines with Link Plan (LP) data, within a few rows of the subsystem ID number
-                # this defines the offset point from other linked intersections
-                # LP1 -> LP4
-                # reminder: range(1,5) means [1, 2, 3, 4]
-                # reminder: SCATS LX LP data comes over 4 lines -> need to extract one at a time
-                for lp_id in range(1,5):
-                    line_n_search = count
-                    stop_loop = 0
-                    search_term_lp = f'LP{lp_id}='
-                    print(f'[INFO] Processing Subsystem {subsys_id}, LP{lp_id}')
-                    
-                    while not stop_loop:
-                        if search_term_lp in lines[line_n_search]:
-                            lp_line_items = lines[line_n_search].strip().split('!')
-
-                            # get the LP data
-                            lp_item = lp_line_items[0]
-                            # split on `=` and take index=1 with the Subsystem ID
-                            lp_item = lp_item.split('=')
-                            lp_item = lp_item[1].strip()
-                            # append LP data
-                            subsys_data.append(lp_item)
-                            # extract LP metadata
-                            lp_data = lp_breakdown(lp_item, break_at_nonNumeric)
-                            for lp_data_item in lp_data:
-                                subsys_data.append(lp_data_item)
-
-                            # found what we were looking for -> set breaking condition for loop
-                            stop_loop = 1
-
-                        # prevent infinite loop
-                        # didn't find what we were looking for -> set breaking condition for loop
-                        if line_n_search > (count + search_limit):
-                            stop_loop = 1
-                            # add to error list with message
-                            error_subsys.append([subsys_id, 'Subsystem not found'])
-
-                        # increment line number
-                        line_n_search += 1
-
-                # if we have all the data we need, append to the main list        
-                ### UPDATE to be desired number of parameters when all done
-                if len(subsys_data) > 0:
-                    lx_subsys_data.append(subsys_data)
-
-        print(f'[INFO] Number of LP plan items identified: {len(lx_subsys_data)}')
+    site_ids = volume.index.to_numpy(dtype='int32')
+    n_days = np.array([len(site_days.get(site_id, ())) for site_id in site_ids.tolist()], dtype='int16')
+    volume = volume.to_numpy(dtype='int64').reshape(len(site_ids), len(VOLUME_COLUMNS))
+    n_records = n_records.to_numpy(dtype='int32').reshape(len(site_ids), len(VOLUME_COLUMNS))
     
-    print(f'[INFO] Parsed through LX file - relevant data extracted')
+    # one row per site and interval
+    df_volumes = pd.DataFrame({'site_id': np.repeat(site_ids, len(VOLUME_COLUMNS)),
+                               'interval': np.tile(np.arange(len(VOLUME_COLUMNS), dtype='int8'), len(site_ids)),
+                               'volume': volume.ravel(),
+                               'n_records': n_records.ravel(),
+                               'n_days': np.repeat(n_days, len(VOLUME_COLUMNS))})
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df_volumes['mean_volume'] = (df_volumes['volume'] / df_volumes['n_days']).astype('float32')
+    print(f'[INFO] Number of sites with volume data: {len(site_ids)}')
     
-    ### PART 3 - CONVERT LX DATA TO DATAFRAMES
-    # set column names
-    columns_intData = ['site_id', 'subsystem_id',
-                       'PP1_data', 'PP1_offset1', 'PP1_offset2', 'PP1_phaseStart', 'PP1_phase', 'PP1_slaved',
-                       'PP2_data', 'PP2_offset1', 'PP2_offset2', 'PP2_phaseStart', 'PP2_phase', 'PP2_slaved',
-                       'PP3_data', 'PP3_offset1', 'PP3_offset2', 'PP3_phaseStart', 'PP3_phase', 'PP3_slaved',
-                       'PP4_data', 'PP4_offset1', 'PP4_offset2', 'PP4_phaseStart', 'PP4_phase', 'PP4_slaved']
-
-    columns_subsysData = ['subsystem_id',
-                          'LP1_data', 'LP1_offset1', 'LP1_offset2', 'LP1_phaseStart', 'LP1_phase', 'LP1_slaved',
-                          'LP2_data', 'LP2_offset1', 'LP2_offset2', 'LP2_phaseStart', 'LP2_phase', 'LP2_slaved',
-                          'LP3_data', 'LP3_offset1', 'LP3_offset2', 'LP3_phaseStart', 'LP3_phase', 'LP3_slaved',
-                          'LP4_data', 'LP4_offset1', 'LP4_offset2', 'LP4_phaseStart', 'LP4_phase', 'LP4_slaved']
+    ### PART 3 - JOIN TO THE SITE LOCATIONS
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_volume = volume / np.maximum(n_days, 1)[:, np.newaxis]
+    peak_interval = mean_volume.argmax(axis=1) if len(site_ids) > 0 else np.array([], dtype='int')
+    df_sites = pd.DataFrame({'site_id': site_ids,
+                             'n_days': n_days,
+                             'volume_24hour': mean_volume.sum(axis=1),
+                             'peak_interval': peak_interval.astype('int8'),
+                             'peak_volume': mean_volume[np.arange(len(site_ids)), peak_interval]})
+    site_xy = _lookup_xy(site_index, site_ids)
+    gdf_sites = gpd.GeoDataFrame(df_sites, geometry=_points(site_xy, site_index[2]))
+    has_location = ~np.isnan(site_xy).any(axis=1)
     
-    # create dataframes
-    df_intData = pd.DataFrame(lx_int_data, columns=columns_intData)
-    df_subsys = pd.DataFrame(lx_subsys_data, columns=columns_subsysData)
-    # merge dataframes
-    df = df_intData.merge(df_subsys, on='subsystem_id', how='left')
-    # fill any locations with no data with -1
-    df = df.fillna(-1) # tag for no data
-    
-    # convert site_id to integer
-    df['site_id'] = df['site_id'].astype('int')
-    df['PP1_slaved'] = df['PP1_slaved'].astype('int')
-    df['PP2_slaved'] = df['PP2_slaved'].astype('int')
-    df['PP3_slaved'] = df['PP3_slaved'].astype('int')
-    df['PP4_slaved'] = df['PP4_slaved'].astype('int')
-    df['LP1_slaved'] = df['LP1_slaved'].astype('int')
-    df['LP2_slaved'] = df['LP2_slaved'].astype('int')
-    df['LP3_slaved'] = df['LP3_slaved'].astype('int')
-    df['LP4_slaved'] = df['LP4_slaved'].astype('int')
+    layers = {'volume_sites': gdf_sites.loc[has_location]}
     
-    # sort values
-    df = df.sort_values(by=['site_id'])
+    ### PART 4 - JOIN TO THE LX DATA
+    if lx_file_path:
+        lx_outputs, _, _ = lx_to_memory(lx_file_path, 
+                                        scats_sites_path, 
+                                        col_scats_x=col_scats_x, 
+                                        col_scats_y=col_scats_y, 
+                                        scats_input_crs_id=scats_input_crs_id, 
+                                        scats_projected_crs_id=scats_projected_crs_id, 
+                                        break_at_nonNumeric=break_at_nonNumeric,
+                                        search_term_intID=search_term_intID,
+                                        search_term_subsystem=search_term_subsystem,
+                                        search_term_pp=search_term_pp,
+                                        search_term_subsystemData=search_term_subsystemData,
+                                        search_limit=search_limit,
+                                        skip_initial_lines=skip_initial_lines)
+        site_volume = df_sites.set_index('site_id')['volume_24hour']
+        if 'allPlans_sites' in lx_outputs:
+            gdf = lx_outputs['allPlans_sites']
+            layers['volume_plan_sites'] = gdf.assign(volume_24hour=gdf['site_id'].map(site_volume).to_numpy())
+        if 'allPlans_links' in lx_outputs:
+            gdf = lx_outputs['allPlans_links']
+            layers['volume_plan_links'] = gdf.assign(volume_24hour=gdf['site_id'].map(site_volume).to_numpy(),
+                                                     to_volume_24hour=gdf['slaved'].map(site_volume).to_numpy())
     
-    if output_folderPath_LX_processed:
+    ### PART 5 - EXPORT
+    if output_folderPath_volumes_processed:
         # check if directories exist; create if not
-        make_output_dir(output_folderPath_LX_processed)
-        # export file
-        lx_fileName = Path(lx_file_path)
-        lx_fileName = lx_fileName.stem
-        df.to_csv(Path(output_folderPath_LX_processed,f'LX_processed_{lx_fileName}.csv'), index=False)
-    
-    ### PART 4 - CONVERT TO GIS / GEODATAFRAME
-    # reduce the gdf to only the columns required for merging
-    gdf_scatsLoc_merge = gdf_scatsLoc[['Equipment_ID', 'geometry']]
-    # merge point data
-    df = df.merge(gdf_scatsLoc_merge, left_on='site_id', right_on='Equipment_ID', how='left')
-    df = df.drop(columns=['Equipment_ID'])
-    # convert back into gpd.GeoDataFrame
-    gdf_lx = gpd.GeoDataFrame(df, geometry='geometry')
-    
-    # extract sites with no geometry data for review
-    gdf_lx_noData = gdf_lx.loc[gdf_lx.geometry == None]
+        make_output_dir(output_folderPath_volumes_processed)
+        _write_table(df_volumes, 
+                     Path(output_folderPath_volumes_processed, f'volumes_processed_{volume_fileName}'), 
+                     processed_format).close()
+    
     if output_gis_folderPath:
         # check if directories exist; create if not
         make_output_dir(output_gis_folderPath)
-        # export file
-        gdf_lx_noData.to_csv(Path(output_gis_folderPath)/'gdf_lx_noGeometry.csv', index=False)
-    # delete the sites without geometry data
-    gdf_lx = gdf_lx.loc[gdf_lx.geometry != None]
-    
-    ### PART 5 - EXPORT TO GPKG
-    # extract data by plans (1..4)
-    for plan_id in range(1, 5):
-        print(f'[INFO] Exporting geopackage for Plan ID: {plan_id}')
-
-        # reduce the SCATS locations gdf to only the columns required for merging
-        gdf_scatsLoc_merge = gdf_scatsLoc[['Equipment_ID', 'geometry']]
-
-        # PART 5A - CREATE PPx DATA EXPORT
-        # Show the internal reference point of each intersection
-        # setup columns names to extract
-        column_names = ['site_id', 'subsystem_id',
-                        f'PP{plan_id}_data', f'PP{plan_id}_offset1', f'PP{plan_id}_offset2',
-                        f'PP{plan_id}_phaseStart', f'PP{plan_id}_phase', f'PP{plan_id}_slaved',
-                        f'LP{plan_id}_data', f'LP{plan_id}_offset1', f'LP{plan_id}_offset2',
-                        f'LP{plan_id}_phaseStart', f'LP{plan_id}_phase', f'LP{plan_id}_slaved',
-                        'geometry']
-
-        # filter gdf
-        gdf = gdf_lx[column_names]
-
-        # rename the PPx_Data and LPx_Data columns -> this will make creating generic GIS styles easier
-        gdf = gdf.rename(columns={f'PP{plan_id}_data': 'PP_data',
-                                  f'LP{plan_id}_data': 'LP_data'})
-
-        # export to file by plan_id
-        if output_gis_folderPath:
-            # check if directories exist; create if not
-            make_output_dir(output_gis_folderPath)
-            # export file
-            export_filename = f'LX_plan{plan_id}_{lx_fileName[:-3]}.gpkg'
-            layer_name = f'PP{plan_id}_data'
-            gdf.to_file(Path(output_gis_folderPath)/export_filename,
-                        driver='GPKG',
-                        layer=layer_name)
-
-        # PART 5B - CREATE LPx DATA EXPORTS
-        # Show the adjacent sites the intersection is linked to
-        # Note: LPx = standard linkage between sites, SL = SLaved & hard-linkage
-
-        # rename the geometry column to minimise conflict with later LP data joins
-        gdf = gdf.rename(columns={'geometry': 'geometry_PP'})
-
-        # merge point data
-        gdf = gdf.merge(gdf_scatsLoc_merge,
-                        left_on=f'LP{plan_id}_slaved',
-                        right_on='Equipment_ID',
-                        how='left')
-        gdf = gdf.drop(columns=['Equipment_ID'])
-
-        # rename the geometry column to minimise conflict with geometry for LineString
-        gdf = gdf.rename(columns={'geometry': 'geometry_LP'})
-
-        # delete any rows where LP_geometry is None -> we don't need these (and will cause error anyway)
-        gdf = gdf.loc[gdf.geometry_LP != None]
-
-        # check if df is empty
-        # skip export if empty - there's nothing anyway
-        if gdf.shape[0] > 0:
-            # create LineString for LP linkages
-            gdf['geometry'] = None
-            for row in gdf.itertuples():
-                gdf.loc[row.Index, 'geometry'] = LineString([row.geometry_PP, row.geometry_LP])
-
-            # export to file by plan_id
-            # create export-specific variable & drop PP and LP geometry columns
-            # (multiple geometry columns cause errors)
-            gdf_export = gdf.drop(columns=['geometry_PP', 'geometry_LP'])
-            # export file
-            if output_gis_folderPath:
-                # check if directories exist; create if not
-                make_output_dir(output_gis_folderPath)
-                # export file
-                export_filename = f'LX_plan{plan_id}_{lx_fileName[:-3]}.gpkg'
-                layer_name = f'LP{plan_id}_data'
-                gdf_export.to_file(Path(output_gis_folderPath)/export_filename,
-                                   driver='GPKG', layer=layer_name)
-        else:
-            print('[INFO] No LP sites')
-
-        # PART 5C - CREATE SL DATA EXPORTS
-        # Show the adjacent sites the intersection is linked to
-        # Note: LPx = standard linkage between sites, SL = SLaved & hard-linkage
-
-        # delete the 'geometry' column -> this will be re-created later for the SL sites
-        try:
-            gdf = gdf.drop(columns=['geometry'])
-        except KeyError:
-            print('[WARNING] `geometry` column not in df. This may be an expected outcome if there was no LP export')
-
-        # merge point data
-        gdf = gdf.merge(gdf_scatsLoc_merge,
-                        left_on=f'PP{plan_id}_slaved',
-                        right_on='Equipment_ID',
-                        how='left')
-        gdf = gdf.drop(columns=['Equipment_ID'])
-
-        # rename the geometry column to minimise conflict with geometry for LineString
-        gdf = gdf.rename(columns={'geometry': 'geometry_SL'})
-
-        # delete any rows where LP_geometry is None -> we don't need these (and will cause error anyway)
-        gdf = gdf.loc[gdf.geometry_SL != None]
-
-        # check if df is empty
-        # skip export if empty - there's nothing anyway
-        if gdf.shape[0] > 0:
-            # create LineString for SL linkages
-            gdf['geometry'] = None
-            for row in gdf.itertuples():
-                gdf.loc[row.Index, 'geometry'] = LineString([row.geometry_PP, row.geometry_SL])
-
-            # export to file by plan_id
-            # create export-specific variable & drop PP and LP geometry columns
-            # (multiple geometry columns cause errors)
-            gdf_export = gdf.drop(columns=['geometry_PP', 'geometry_LP', 'geometry_SL'])
-            # export file
-            if output_gis_folderPath:
-                # check if directories exist; create if not
-                make_output_dir(output_gis_folderPath)
-                # export file
-                export_filename = f'LX_plan{plan_id}_{lx_fileName[:-3]}.gpkg'
-                layer_name = f'SL{plan_id}_data'
-                gdf_export.to_file(Path(output_gis_folderPath)/export_filename,
-                                   driver='GPKG', layer=layer_name)
-                print(f'[INFO] DONE Exporting geopackage for Plan ID: {plan_id}')
-        else:
-            print('[INFO] No SL sites')
+        # extract sites with no geometry data for review
+        _write_table(pd.DataFrame(gdf_sites.loc[~has_location]), 
+                     Path(output_gis_folderPath)/'gdf_volumes_noGeometry', 
+                     'csv').close()
+        layers_written = set()
+        for layer_name, gdf_export in layers.items():
+            _write_layer(gdf_export, 
+                         Path(output_gis_folderPath)/f'volumes_{volume_fileName}.gpkg', 
+                         layer_name, 
+                         layers_written)
+        for gpkg_path, layer_name in sorted(layers_written):
+            _index_gpkg_layer(gpkg_path, layer_name)
     
-    return df, error_ints, error_subsys
-
+    return df_volumes, gdf_sites
@@ -1,5 +1,509 @@
+import gc
+import io
+import json
+import pstats
+import sqlite3
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+import pyogrio
+
 from scatsutilities import __version__
 from scatsutilities import scatsutilities
 
+
+def make_lx_text(n_sites, sites_per_subsystem=4):
+    """Synthetic LX file with `n_sites` sites (Site IDs from 100) in subsystems of `sites_per_subsystem`"""
+    lines = [f'HEADER{i}!' for i in range(12)]
+    for i in range(n_sites):
+        site_id = 100 + i
+        lines.append(f'I=1!INT={site_id}!')
+        lines.append(f'S#={1 + i // sites_per_subsystem}!XS=0!')
+        # some sites slaved to the previous site in PP2
+        pp2 = f'0SL{site_id - 1}A' if i % 7 == 3 else '5,10A'
+        lines.append(f'PP1=0,0F!PP2={pp2}!')
+        lines.append('PP3=0,5^B!PP4=0,0F!')
+    for subsystem_id in range(1, (n_sites - 1) // sites_per_subsystem + 2):
+        first_site = 100 + (subsystem_id - 1) * sites_per_subsystem
+        lines.append(f'SS={subsystem_id}!')
+        lines.append(f'LP1=6,10A{first_site + 1}!')
+        lines.append('LP2=0!' if subsystem_id % 2 == 0 else f'LP2=3,7B{first_site + 3}!')
+        lines.append(f'LP3=6,10^A{first_site}!')
+        lines.append(f'LP4=0SL{first_site + 2}A!')
+    return '\n'.join(lines) + '\n'
+
+
+def make_sites_text(n_sites):
+    """Synthetic SCATS site locations, with every 13th site missing"""
+    rows = ['Equipment_ID,Longitude,Latitude']
+    for i in range(n_sites):
+        if i % 13 == 5:
+            continue
+        rows.append(f'{100 + i},{151 + (i % 100) * 0.001},{-33.8 - (i // 100) * 0.001}')
+    return '\n'.join(rows) + '\n'
+
+
+def make_volumes_text(n_sites, n_days=2, n_detectors=3):
+    """Synthetic SCATS detector volume data (one row per site, detector and day), with no data (-1) for detector 3"""
+    rows = ['NB_SCATS_SITE,QT_INTERVAL_COUNT,NB_DETECTOR,' + ','.join(f'V{i:02d}' for i in range(96)) + ',NM_REGION']
+    for day in range(1, n_days + 1):
+        for i in range(n_sites):
+            for detector in range(1, n_detectors + 1):
+                volumes = [-1 if detector == 3 else detector * (interval % 4) for interval in range(96)]
+                rows.append(f'{100 + i},2021-01-0{day} 00:00:00,{detector},' + ','.join(map(str, volumes)) + ',REG')
+    return '\n'.join(rows) + '\n'
+
+
+def write_inputs(folder, n_sites, n_sites_locations=None, sites_per_subsystem=4):
+    lx_file_path = folder / 'test.lx'
+    scats_sites_path = folder / 'sites.csv'
+    lx_file_path.write_text(make_lx_text(n_sites, sites_per_subsystem))
+    scats_sites_path.write_text(make_sites_text(n_sites_locations or n_sites))
+    return lx_file_path, scats_sites_path
+
+
 def test_version():
-    assert __version__ == '0.1.0'
\ No newline at end of file
+    assert __version__ == '0.1.0'
+
+
+def test_lx_to_gis(tmp_path):
+    lx_file_path, scats_sites_path = write_inputs(tmp_path, 20)
+    df, error_ints, error_subsys = scatsutilities.lx_to_gis(lx_file_path, scats_sites_path,
+                                                            output_folderPath_LX_processed=tmp_path,
+                                                            output_gis_folderPath=tmp_path)
+    assert df.shape[0] == 20
+    assert error_ints == [] and error_subsys == []
+    assert df.loc[df.site_id == 103, 'PP2_slaved'].item() == 102
+    assert pyogrio.list_layers(tmp_path/'LX_plan2_t.gpkg')[:, 0].tolist() == ['PP2_data', 'LP2_data', 'SL2_data', 
+                                                                        'SS2_corridors']
+
+
+def test_lx_to_gis_chunked(tmp_path):
+    lx_file_path, scats_sites_path = write_inputs(tmp_path, 20)
+    scatsutilities.lx_to_gis(lx_file_path, scats_sites_path,
+                             output_folderPath_LX_processed=tmp_path/'full',
+                             output_gis_folderPath=tmp_path/'full')
+    df, _, _ = scatsutilities.lx_to_gis(lx_file_path, scats_sites_path,
+                                        output_folderPath_LX_processed=tmp_path/'chunked',
+                                        output_gis_folderPath=tmp_path/'chunked',
+                                        chunk_size=3)
+    assert df is None
+    
+    df_full = pd.read_csv(tmp_path/'full'/'LX_processed_test.csv')
+    df_chunked = pd.read_csv(tmp_path/'chunked'/'LX_processed_test.csv')
+    pd.testing.assert_frame_equal(df_full, df_chunked)
+    # link metric summary exported as each subsystem is finished
+    df_full = pd.read_csv(tmp_path/'full'/'LX_linkMetrics_test.csv')
+    df_chunked = pd.read_csv(tmp_path/'chunked'/'LX_linkMetrics_test.csv')
+    pd.testing.assert_frame_equal(df_full, df_chunked)
+    for plan_id in range(1, 5):
+        file_name = f'LX_plan{plan_id}_t.gpkg'
+        for layer_name, _ in pyogrio.list_layers(tmp_path/'full'/file_name):
+            gdf_full = pyogrio.read_dataframe(tmp_path/'full'/file_name, layer=layer_name)
+            gdf_chunked = pyogrio.read_dataframe(tmp_path/'chunked'/file_name, layer=layer_name)
+            assert gdf_full.shape == gdf_chunked.shape
+
+
+def test_lx_to_gis_indexes(tmp_path):
+    lx_file_path, scats_sites_path = write_inputs(tmp_path, 20)
+    scatsutilities.lx_to_gis(lx_file_path, scats_sites_path, output_gis_folderPath=tmp_path, chunk_size=6)
+    
+    with sqlite3.connect(tmp_path/'LX_plan1_t.gpkg') as con:
+        indexes = {row[0] for row in con.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        rtree = {row[0] for row in con.execute("SELECT table_name FROM gpkg_extensions "
+                                               "WHERE extension_name = 'gpkg_rtree_index'")}
+    assert rtree == {'PP1_data', 'LP1_data', 'SS1_corridors'}
+    assert {'idx_LP1_data_site_id', 'idx_LP1_data_subsystem_id', 
+            'idx_LP1_data_PP1_slaved', 'idx_LP1_data_LP1_slaved'} <= indexes
+    
+    # combined layers of all plans
+    gdf_links = pyogrio.read_dataframe(tmp_path/'LX_allPlans_t.gpkg', layer='allPlans_links')
+    n_links = sum(pyogrio.read_info(tmp_path/f'LX_plan{plan_id}_t.gpkg', layer=layer_name)['features'] 
+                  for plan_id in range(1, 5) 
+                  for layer_name, _ in pyogrio.list_layers(tmp_path/f'LX_plan{plan_id}_t.gpkg') 
+                  if layer_name[:2] in ('LP', 'SL'))
+    assert gdf_links.shape[0] == n_links
+    with sqlite3.connect(tmp_path/'LX_allPlans_t.gpkg') as con:
+        query_plan = con.execute("EXPLAIN QUERY PLAN SELECT * FROM allPlans_links "
+                                 "WHERE subsystem_id = '2' AND plan_id = 3").fetchall()
+    assert 'USING INDEX idx_allPlans_links_subsystem_id_plan_id' in query_plan[0][-1]
+
+
+def test_lx_to_gis_chunked_memory(tmp_path):
+    # peak memory in streaming mode should not grow with the number of sites in the LX file
+    # (4 sites per subsystem -> the number of subsystems grows with the number of sites, as in real networks)
+    lx_file_path, scats_sites_path = write_inputs(tmp_path, 20)
+    # not traced -> one-off costs (e.g. GDAL driver set-up) are not included in the first peak
+    scatsutilities.lx_to_gis(lx_file_path, scats_sites_path, output_gis_folderPath=tmp_path, chunk_size=10)
+    peak_memory = []
+    for n_sites in (200, 3200):
+        (tmp_path/str(n_sites)).mkdir()
+        lx_file_path, scats_sites_path = write_inputs(tmp_path/str(n_sites), n_sites, n_sites_locations=3200)
+        gc.collect()
+        tracemalloc.start()
+        scatsutilities.lx_to_gis(lx_file_path, scats_sites_path,
+                                 output_folderPath_LX_processed=tmp_path/str(n_sites),
+                                 output_gis_folderPath=tmp_path/str(n_sites),
+                                 chunk_size=100)
+        peak_memory.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    
+    # the LP data and remaining site count of each subsystem are kept in memory, and pyogrio keeps a few 
+    # hundred bytes for each layer write (about 50% more at 16x the sites, subsystems and chunks)
+    assert peak_memory[1] < 1.75 * peak_memory[0]
+
+
+def test_lx_to_gis_chunked_memory_corridors(tmp_path):
+    # subsystem corridors are written as each subsystem is finished -> the link keys and geometry
+    # of all corridors should not be held until the end of the LX file
+    peak_memory = []
+    for n_sites in (400, 400, 3200):
+        run_path = tmp_path/str(len(peak_memory))
+        run_path.mkdir()
+        lx_file_path, scats_sites_path = write_inputs(run_path, n_sites, n_sites_locations=3200,
+                                                      sites_per_subsystem=n_sites // 50)
+        if peak_memory:
+            tracemalloc.start()
+        scatsutilities.lx_to_gis(lx_file_path, scats_sites_path,
+                                 output_gis_folderPath=run_path,
+                                 record_types=('LP', 'SL'),
+                                 chunk_size=200)
+        # first run not traced -> one-off costs (e.g. GDAL driver set-up)
+        peak_memory.append(tracemalloc.get_traced_memory()[1] if peak_memory else None)
+        tracemalloc.stop()
+
+    assert peak_memory[2] < 1.4 * peak_memory[1]
+
+
+def test_lx_to_memory(tmp_path):
+    lx_file_path, scats_sites_path = write_inputs(tmp_path, 20)
+    df, _, _ = scatsutilities.lx_to_gis(lx_file_path, scats_sites_path)
+    
+    # bytes, binary and text file objects
+    outputs, error_ints, error_subsys = scatsutilities.lx_to_memory(lx_file_path.read_bytes(),
+                                                                    scats_sites_path.read_bytes())
+    with open(lx_file_path, 'r') as f_lx, open(scats_sites_path, 'rb') as f_sites:
+        outputs_file, _, _ = scatsutilities.lx_to_memory(f_lx, f_sites)
+    assert error_ints == [] and error_subsys == []
+    assert outputs['LX_processed'].shape[0] == df.shape[0]
+    assert set(outputs) == set(outputs_file)
+    assert 'SL2_data' in outputs
+    for name in outputs:
+        assert outputs[name].shape == outputs_file[name].shape
+    
+    outputs_gpkg, _, _ = scatsutilities.lx_to_memory(lx_file_path.read_bytes(),
+                                                     scats_sites_path.read_bytes(),
+                                                     output_format='gpkg')
+    gdf = pyogrio.read_dataframe(io.BytesIO(outputs_gpkg['LP1_data']))
+    assert gdf.shape == outputs['LP1_data'].shape
+
+
+def test_lx_to_memory_concurrent(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    lx_bytes = make_lx_text(40).encode()
+    sites_bytes = make_sites_text(40).encode()
+    
+    def run(_):
+        outputs, _, _ = scatsutilities.lx_to_memory(lx_bytes, sites_bytes, output_format='gpkg')
+        return {name: len(output) > 0 for name, output in outputs.items()}
+    
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(run, range(8)))
+    assert all(result == results[0] for result in results)
+    # nothing written to disk
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_link_geometry_shared_across_plans():
+    # subsystem 1 linked to site 101 in both LP1 and LP3
+    lx_text = make_lx_text(8).replace('LP3=6,10^A100!', 'LP3=6,10^A101!')
+    outputs, _, _ = scatsutilities.lx_to_memory(lx_text.encode(), make_sites_text(8).encode())
+    gdf_LP1 = outputs['LP1_data'].set_index('site_id')
+    gdf_LP3 = outputs['LP3_data'].set_index('site_id')
+    assert gdf_LP1.geometry[100] is gdf_LP3.geometry[100]
+    assert gdf_LP1.loc[100, 'link_length'] == pytest.approx(gdf_LP1.geometry[100].length)
+    # site 101 is east of site 100
+    assert gdf_LP1.loc[100, 'link_bearing'] == pytest.approx(90, abs=5)
+
+
+def test_lx_to_memory_selection(capsys):
+    lx_bytes = make_lx_text(20).encode()
+    sites_bytes = make_sites_text(20).encode()
+    
+    outputs, _, _ = scatsutilities.lx_to_memory(lx_bytes, sites_bytes, record_types=('PP',))
+    assert sorted(outputs) == ['LX_plans', 'LX_processed', 'PP1_data', 'PP2_data', 'PP3_data', 'PP4_data', 
+                               'allPlans_sites', 'gdf_lx_noGeometry']
+    # LP data not processed
+    assert 'Processing Subsystem' not in capsys.readouterr().out
+    
+    outputs, _, _ = scatsutilities.lx_to_memory(lx_bytes, sites_bytes, sites=[101, 106], plans=(1, 3))
+    assert outputs['LX_processed'].site_id.tolist() == [101, 106]
+    assert sorted(outputs) == ['LP1_data', 'LP3_data', 'LX_linkMetrics', 'LX_plans', 'LX_processed', 
+                               'PP1_data', 'PP3_data', 'SS1_corridors', 'SS3_corridors', 'allPlans_links', 
+                               'allPlans_sites', 'gdf_lx_noGeometry']
+    assert outputs['LX_plans'].plan_id.unique().tolist() == [1, 3]
+    # only the subsystems of the selected sites, and the selected plans are processed
+    stdout = capsys.readouterr().out
+    assert stdout.count('Processing Subsystem') == 4
+    assert outputs['LX_processed'].LP2_data.eq(-1).all()
+    
+    outputs, _, _ = scatsutilities.lx_to_memory(lx_bytes, sites_bytes, subsystems=[2])
+    assert outputs['LX_processed'].site_id.tolist() == [104, 105, 106, 107]
+    
+    capsys.readouterr()
+    # unknown plans and record types are rejected before processing
+    with pytest.raises(ValueError, match='Unknown plan'):
+        scatsutilities.lx_to_memory(lx_bytes, sites_bytes, plans=(5,))
+    with pytest.raises(ValueError, match='Unknown record type'):
+        scatsutilities.lx_to_memory(lx_bytes, sites_bytes, record_types=('pp',))
+    with pytest.raises(ValueError, match='Unknown plan'):
+        scatsutilities.lx_to_gis(lx_bytes, sites_bytes, plans=(0, 1))
+    assert 'Processing' not in capsys.readouterr().out
+
+
+def test_lx_plans():
+    outputs, _, _ = scatsutilities.lx_to_memory(make_lx_text(20).encode(), make_sites_text(20).encode())
+    df_plans = outputs['LX_plans']
+    df = outputs['LX_processed']
+    # one row per site, plan and record type
+    assert df_plans.shape[0] == df.shape[0] * 4 * 2
+    assert list(df_plans.columns) == ['site_id', 'subsystem_id', 'plan_id', 'record_type', 
+                                      'data', 'offset1', 'offset2', 'phaseStart', 'phase', 'slaved']
+    # the wide table is the same data
+    row = df_plans.loc[(df_plans.site_id == 103) & (df_plans.plan_id == 2)].set_index('record_type')
+    site = df.set_index('site_id').loc[103]
+    for field in ['data', 'offset1', 'offset2', 'phaseStart', 'phase', 'slaved']:
+        assert row.loc['PP', field] == site[f'PP2_{field}']
+        assert row.loc['LP', field] == site[f'LP2_{field}']
+    assert row.loc['PP', 'slaved'] == 102
+    # the layers of each plan use the same data
+    gdf = outputs['PP2_data'].set_index('site_id')
+    assert gdf.loc[103, 'PP_data'] == row.loc['PP', 'data']
+    assert gdf.loc[103, 'LP2_slaved'] == row.loc['LP', 'slaved']
+
+
+def test_merge_lx_to_gis(tmp_path):
+    # region A has sites 100-109, region B has sites 100-119
+    # -> sites 108 and 109 of region A are linked to sites 110 and 111 of region B
+    lx_file_path, scats_sites_path = write_inputs(tmp_path, 20)
+    lx_file_paths = [tmp_path / 'region_a.lx', tmp_path / 'region_b.lx']
+    lx_file_paths[0].write_text(make_lx_text(10))
+    lx_file_paths[1].write_text(make_lx_text(20))
+    
+    df, _, _ = scatsutilities.lx_to_gis(lx_file_path, scats_sites_path, output_gis_folderPath=tmp_path/'single')
+    df_merged, error_ints, error_subsys, df_duplicates = scatsutilities.merge_lx_to_gis(
+        lx_file_paths, scats_sites_path,
+        output_folderPath_LX_processed=tmp_path/'merged',
+        output_gis_folderPath=tmp_path/'merged')
+    assert error_ints == [] and error_subsys == []
+    pd.testing.assert_frame_equal(df_merged, df)
+    # duplicated sites are kept from the first LX file
+    assert df_duplicates.shape[0] == 10 * 2
+    assert df_duplicates.loc[df_duplicates.kept, 'lx_file'].eq('region_a').all()
+    df_plans = pd.read_csv(tmp_path/'merged'/'LX_plans_merged_LX.csv')
+    assert df_plans.groupby('lx_file').site_id.nunique().to_dict() == {'region_a': 10, 'region_b': 10}
+    # one set of plan layers, with the links between the regions
+    for plan_id in range(1, 5):
+        for layer_name, _ in pyogrio.list_layers(tmp_path/'single'/f'LX_plan{plan_id}_t.gpkg'):
+            if layer_name.endswith('corridors'):
+                continue
+            info = pyogrio.read_info(tmp_path/'merged'/f'LX_plan{plan_id}_merged.gpkg', layer=layer_name)
+            assert info['features'] == pyogrio.read_info(tmp_path/'single'/f'LX_plan{plan_id}_t.gpkg', 
+                                                         layer=layer_name)['features']
+    # Subsystem IDs are only unique within each LX file
+    # -> subsystem 3 of region A (sites 108, 109) and region B (sites 110, 111) are separate corridors
+    gdf_corridors = pyogrio.read_dataframe(tmp_path/'merged'/'LX_plan1_merged.gpkg', layer='SS1_corridors')
+    assert gdf_corridors[['lx_file', 'subsystem_id', 'site_count']].astype('str').values.tolist() == [
+        ['region_a', '1', '4'], ['region_a', '2', '3'], ['region_a', '3', '2'], 
+        ['region_b', '3', '2'], ['region_b', '4', '4'], ['region_b', '5', '3']]
+    df_summary = pd.read_csv(tmp_path/'merged'/'LX_linkMetrics_merged_LX.csv')
+    assert df_summary.loc[(df_summary.subsystem_id == 3) & (df_summary.plan_id == 1) 
+                          & (df_summary.record_type == 'LP'), 'lx_file'].tolist() == ['region_a', 'region_b']
+    with sqlite3.connect(tmp_path/'merged'/'LX_allPlans_merged.gpkg') as con:
+        query_plan = con.execute("EXPLAIN QUERY PLAN SELECT * FROM allPlans_links "
+                                 "WHERE lx_file = 'region_b' AND subsystem_id = '3' AND plan_id = 1").fetchall()
+    assert 'USING INDEX idx_allPlans_links_lx_file_subsystem_id_plan_id' in query_plan[0][-1]
+    
+    # streaming mode: each LX file in turn, with the same data
+    df_chunked, _, _, df_duplicates_chunked = scatsutilities.merge_lx_to_gis(
+        lx_file_paths, scats_sites_path,
+        output_folderPath_LX_processed=tmp_path/'chunked',
+        output_gis_folderPath=tmp_path/'chunked',
+        chunk_size=3)
+    assert df_chunked is None
+    pd.testing.assert_frame_equal(df_duplicates_chunked, df_duplicates)
+    for file_name in ['LX_plans_merged_LX.csv', 'LX_linkMetrics_merged_LX.csv']:
+        df_full = pd.read_csv(tmp_path/'merged'/file_name)
+        df_streamed = pd.read_csv(tmp_path/'chunked'/file_name)
+        pd.testing.assert_frame_equal(df_streamed.sort_values(list(df_full.columns[:4]), ignore_index=True), 
+                                      df_full.sort_values(list(df_full.columns[:4]), ignore_index=True))
+    gdf_streamed = pyogrio.read_dataframe(tmp_path/'chunked'/'LX_plan1_merged.gpkg', layer='SS1_corridors')
+    assert gdf_streamed.drop(columns='geometry').equals(gdf_corridors.drop(columns='geometry'))
+    
+    # all the sites of region A are in region B
+    _, _, _, df_duplicates = scatsutilities.merge_lx_to_gis(lx_file_paths, scats_sites_path, precedence='last')
+    assert df_duplicates.loc[df_duplicates.kept, 'lx_file'].eq('region_b').all()
+    scatsutilities.merge_lx_to_gis(lx_file_paths, scats_sites_path, output_folderPath_LX_processed=tmp_path/'last', 
+                                   precedence='last', chunk_size=3)
+    df_plans = pd.read_csv(tmp_path/'last'/'LX_plans_merged_LX.csv')
+    assert df_plans.groupby('lx_file').site_id.nunique().to_dict() == {'region_b': 20}
+    with pytest.raises(ValueError):
+        scatsutilities.merge_lx_to_gis(lx_file_paths, scats_sites_path, precedence='newest')
+    
+    # bytes inputs have no file name -> named by the caller
+    lx_files = [lx_file_path.read_bytes() for lx_file_path in lx_file_paths]
+    with pytest.raises(ValueError):
+        scatsutilities.merge_lx_to_gis(lx_files, scats_sites_path)
+    _, _, _, df_duplicates = scatsutilities.merge_lx_to_gis(lx_files, scats_sites_path, 
+                                                            output_gis_folderPath=tmp_path/'bytes', 
+                                                            lx_file_names=['region_a', 'region_b'])
+    assert df_duplicates.shape[0] == 10 * 2
+    gdf_bytes = pyogrio.read_dataframe(tmp_path/'bytes'/'LX_plan1_merged.gpkg', layer='SS1_corridors')
+    assert gdf_bytes.drop(columns='geometry').equals(gdf_corridors.drop(columns='geometry'))
+
+
+def test_read_site(tmp_path):
+    lx_file_path, scats_sites_path = write_inputs(tmp_path, 20)
+    outputs, _, _ = scatsutilities.lx_to_memory(lx_file_path, scats_sites_path)
+    df_plans = outputs['LX_plans']
+    
+    index_path = scatsutilities.build_lx_index(lx_file_path)
+    assert index_path == tmp_path / 'test.lx.idx.npz'
+    
+    df_site = scatsutilities.read_site(lx_file_path, 106)
+    pd.testing.assert_frame_equal(df_site, df_plans.loc[df_plans.site_id == 106].reset_index(drop=True))
+    df_subsystem = scatsutilities.read_subsystem(lx_file_path, 2)
+    pd.testing.assert_frame_equal(df_subsystem, df_plans.loc[df_plans.subsystem_id == '2'].reset_index(drop=True))
+    with pytest.raises(ValueError):
+        scatsutilities.read_site(lx_file_path, 999)
+    with pytest.raises(ValueError):
+        scatsutilities.read_subsystem(lx_file_path, 999)
+    
+    # the index is rebuilt if the LX file changes
+    lx_file_path.write_text(make_lx_text(30))
+    df_site = scatsutilities.read_site(lx_file_path, 125, plans=(2,))
+    assert df_site.plan_id.tolist() == [2, 2]
+    assert df_site.subsystem_id.tolist() == ['7', '7']
+
+
+def test_lx_to_gis_profile(tmp_path, monkeypatch):
+    lx_file_path, scats_sites_path = write_inputs(tmp_path, 20)
+    scatsutilities.lx_to_gis(lx_file_path, scats_sites_path, output_gis_folderPath=tmp_path/'gis', plans=(1,), 
+                             profile=True)
+    with open(tmp_path/'gis'/'LX_profile_test'/'summary.json') as f:
+        summary = json.load(f)
+    assert {'read_sites', 'parse', 'links', 'layers', 'to_file_PP1_data', 'gpkg_indexes'} <= set(summary['stages'])
+    parse = summary['stages']['parse']
+    assert parse['calls'] >= 1 and parse['wall_time'] > 0 and parse['peak_memory'] > 0
+    assert 0 < len(parse['top_functions']) <= scatsutilities.PROFILE_TOP_N
+    assert {'location', 'size', 'count'} == set(parse['top_allocations'][0])
+    # the memory of the tracemalloc snapshots is not included
+    assert not any('tracemalloc' in allocation['location'] 
+                   for stage in summary['stages'].values() for allocation in stage['top_allocations'])
+    # cProfile data of each stage
+    stats = pstats.Stats(str(tmp_path/'gis'/'LX_profile_test'/'parse.prof'))
+    assert any(function[2] == 'pp_breakdown' for function in stats.stats)
+    
+    # turned on by environment variable
+    monkeypatch.setenv(scatsutilities.PROFILE_ENV_VAR, '1')
+    scatsutilities.lx_to_gis(lx_file_path, scats_sites_path, output_folderPath_LX_processed=tmp_path/'processed', 
+                             plans=(1,), record_types=('PP',))
+    assert (tmp_path/'processed'/'LX_profile_test'/'summary.json').exists()
+    monkeypatch.setenv(scatsutilities.PROFILE_ENV_VAR, '0')
+    scatsutilities.lx_to_gis(lx_file_path, scats_sites_path, output_folderPath_LX_processed=tmp_path/'off', 
+                             plans=(1,), record_types=('PP',))
+    assert not (tmp_path/'off'/'LX_profile_test').exists()
+
+
+def test_link_metrics():
+    outputs, _, _ = scatsutilities.lx_to_memory(make_lx_text(20).encode(), make_sites_text(20).encode())
+    gdf = outputs['LP1_data']
+    for column in ['link_length', 'link_bearing', 'offset1_per_metre', 'offset2_per_metre']:
+        assert gdf[column].dtype == 'float64'
+    assert gdf['link_length'].to_numpy() == pytest.approx(gdf.geometry.length.to_numpy())
+    # LP1=6,10A... -> offsets of 6 and 10 seconds
+    # (the link from a site to itself has zero length -> NaN)
+    assert gdf['offset2_per_metre'].isna().eq(gdf['link_length'] == 0).all()
+    gdf = gdf.loc[gdf['link_length'] > 0]
+    assert gdf['offset2_per_metre'].to_numpy() == pytest.approx(10 / gdf['link_length'].to_numpy())
+    
+    # summary by subsystem
+    df_summary = outputs['LX_linkMetrics'].set_index(['subsystem_id', 'plan_id', 'record_type'])
+    assert df_summary['n_links'].sum() == sum(outputs[name].shape[0] for name in outputs 
+                                              if name[:2] in ('LP', 'SL') and name[3:] == '_data')
+    assert df_summary.loc[(1, 1, 'LP'), 'total_length'] == pytest.approx(
+        outputs['LP1_data'].loc[lambda x: x.subsystem_id == '1', 'link_length'].sum())
+
+
+def test_subsystem_corridors(tmp_path):
+    outputs, _, _ = scatsutilities.lx_to_memory(make_lx_text(20).encode(), make_sites_text(20).encode())
+    gdf = outputs['SS2_corridors'].set_index('subsystem_id')
+    assert list(gdf.columns) == ['site_count', 'n_links', 'total_length', 'slaved_count', 'broken_links', 'geometry']
+    # subsystem 1: LP2 links of sites 100-103, and site 103 slaved to site 102
+    assert gdf.loc['1', 'site_count'] == 4
+    assert gdf.loc['1', 'slaved_count'] == 1
+    assert gdf.loc['1', 'n_links'] == 5
+    assert gdf.loc['1'].geometry.geom_type == 'MultiLineString'
+    assert gdf.loc['1', 'total_length'] == pytest.approx(gdf.loc['1'].geometry.length)
+    links = pd.concat([outputs['LP2_data'], outputs['SL2_data']])
+    assert gdf['total_length'].sum() == pytest.approx(links['link_length'].sum())
+    # subsystem 2: LP1 links to site 105, which has no location data
+    gdf = outputs['SS1_corridors'].set_index('subsystem_id')
+    assert gdf.loc['2', 'broken_links'] == 3
+    assert gdf.loc['2', 'n_links'] == 0
+    
+    # same corridors in streaming mode, with subsystems split across chunks
+    lx_file_path, scats_sites_path = write_inputs(tmp_path, 20)
+    scatsutilities.lx_to_gis(lx_file_path, scats_sites_path, output_gis_folderPath=tmp_path, chunk_size=3)
+    gdf_chunked = pyogrio.read_dataframe(tmp_path/'LX_plan1_t.gpkg', layer='SS1_corridors').set_index('subsystem_id')
+    pd.testing.assert_frame_equal(gdf_chunked.drop(columns='geometry'), gdf.drop(columns='geometry'), 
+                                  check_dtype=False)
+    assert gdf_chunked.geometry.length.to_numpy() == pytest.approx(gdf.geometry.length.to_numpy(), nan_ok=True)
+
+
+def test_volumes_to_gis(tmp_path, monkeypatch):
+    lx_file_path, scats_sites_path = write_inputs(tmp_path, 20)
+    volumes_path = tmp_path / 'volumes.csv'
+    volumes_path.write_text(make_volumes_text(20))
+    
+    df_volumes, gdf_sites = scatsutilities.volumes_to_gis(volumes_path, scats_sites_path,
+                                                          output_folderPath_volumes_processed=tmp_path,
+                                                          output_gis_folderPath=tmp_path,
+                                                          lx_file_path=lx_file_path,
+                                                          chunk_size=7)
+    assert df_volumes.shape[0] == 20 * 96
+    assert df_volumes['site_id'].dtype == 'int32'
+    row = df_volumes.set_index(['site_id', 'interval']).loc[(105, 3)]
+    # detectors 1 and 2 (detector 3 has no data), 2 days
+    assert row['volume'] == (1 * 3 + 2 * 3) * 2
+    assert row['n_records'] == 2 * 2
+    assert row['n_days'] == 2
+    assert row['mean_volume'] == pytest.approx(9)
+    
+    gdf_sites = gdf_sites.set_index('site_id')
+    assert gdf_sites.loc[105, 'volume_24hour'] == pytest.approx(24 * (0 + 3 + 6 + 9))
+    assert gdf_sites.loc[105, 'peak_interval'] == 3
+    # site 105 has no location data
+    assert gdf_sites.geometry.isna().sum() == 2
+    
+    # same totals when processed in one chunk
+    df_volumes_single, _ = scatsutilities.volumes_to_gis(volumes_path.read_bytes(), scats_sites_path)
+    pd.testing.assert_frame_equal(df_volumes, df_volumes_single)
+    
+    layers = dict(pyogrio.list_layers(tmp_path / 'volumes_volumes.gpkg'))
+    assert set(layers) == {'volume_sites', 'volume_plan_sites', 'volume_plan_links'}
+    gdf_links = pyogrio.read_dataframe(tmp_path / 'volumes_volumes.gpkg', layer='volume_plan_links')
+    assert gdf_links['to_volume_24hour'].notna().all()
+    
+    # the LX parser options are passed on to the LX join
+    lx_options = {}
+    def lx_to_memory(*args, **kwargs):
+        lx_options.update(kwargs)
+        return lx_to_memory_orig(*args, **kwargs)
+    lx_to_memory_orig = scatsutilities.lx_to_memory
+    monkeypatch.setattr(scatsutilities, 'lx_to_memory', lx_to_memory)
+    scatsutilities.volumes_to_gis(volumes_path, scats_sites_path, lx_file_path=lx_file_path, 
+                                  break_at_nonNumeric=True, search_limit=15)
+    assert lx_options['break_at_nonNumeric'] and (lx_options['search_limit'] == 15)